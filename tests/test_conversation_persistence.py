@@ -0,0 +1,159 @@
+# Copyright 2025 Alejandro Martínez Corriá and the Thinkube contributors
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Unit tests for the in-memory conversation cache and delayed saves."""
+
+import asyncio
+
+import pytest
+
+from tk_ai_extension import conversation_persistence as persistence
+
+
+@pytest.fixture
+def mtimes(monkeypatch):
+    """Fake notebook file modification times, keyed by path (missing = no file)."""
+    mtimes = {}
+    monkeypatch.setattr(persistence, "_file_mtime_ns", mtimes.get)
+    return mtimes
+
+
+@pytest.fixture
+def store(monkeypatch, mtimes):
+    """Isolate the module cache and record saves instead of touching notebooks."""
+    saves = []
+
+    async def fake_save(notebook_path, messages, serverapp=None):
+        saves.append((notebook_path, messages))
+        return True
+
+    monkeypatch.setattr(persistence, "_conversations", {})
+    monkeypatch.setattr(persistence, "_conversation_mtimes", {})
+    monkeypatch.setattr(persistence, "_pending_saves", {})
+    monkeypatch.setattr(persistence, "_save_locks", {})
+    monkeypatch.setattr(persistence, "SAVE_DELAY", 0.01)
+    monkeypatch.setattr(persistence, "load_conversation_from_notebook", lambda path: [{"role": "user", "content": "old"}])
+    monkeypatch.setattr(persistence, "save_conversation_to_notebook", fake_save)
+    return saves
+
+
+class TestConversationCache:
+    """Tests for get_conversation and append_to_conversation."""
+
+    def test_loads_once(self, store, monkeypatch):
+        """Test history is read from the notebook only on first use."""
+        assert persistence.get_conversation("a.ipynb") == [{"role": "user", "content": "old"}]
+
+        monkeypatch.setattr(persistence, "load_conversation_from_notebook", lambda path: [])
+        assert len(persistence.get_conversation("a.ipynb")) == 1
+
+    def test_reloads_when_file_changes(self, store, mtimes, monkeypatch):
+        """Test an edited, deleted or recreated notebook is read again."""
+        mtimes["a.ipynb"] = 1
+        persistence.get_conversation("a.ipynb")
+        monkeypatch.setattr(persistence, "load_conversation_from_notebook", lambda path: [])
+
+        mtimes["a.ipynb"] = 2
+        assert persistence.get_conversation("a.ipynb") == []
+
+        monkeypatch.setattr(persistence, "load_conversation_from_notebook", lambda path: [{"role": "user", "content": "new"}])
+        del mtimes["a.ipynb"]
+        assert persistence.get_conversation("a.ipynb") == [{"role": "user", "content": "new"}]
+
+    @pytest.mark.asyncio
+    async def test_pending_history_kept_when_file_changes(self, store, mtimes):
+        """Test unsaved exchanges survive a file change until they're written."""
+        mtimes["a.ipynb"] = 1
+        persistence.append_to_conversation("a.ipynb", [{"role": "user", "content": "1"}])
+        mtimes["a.ipynb"] = 2
+
+        assert [m["content"] for m in persistence.get_conversation("a.ipynb")] == ["old", "1"]
+        await asyncio.sleep(0.05)
+
+        # The save records the file state it was written against
+        assert [m["content"] for m in persistence.get_conversation("a.ipynb")] == ["old", "1"]
+
+    @pytest.mark.asyncio
+    async def test_cache_bounded(self, store, monkeypatch):
+        """Test least recently used histories are dropped unless a save is pending."""
+        monkeypatch.setattr(persistence, "MAX_CACHED_CONVERSATIONS", 2)
+        persistence.append_to_conversation("a.ipynb", [{"role": "user", "content": "1"}])
+        persistence.get_conversation("b.ipynb")
+        persistence.get_conversation("c.ipynb")
+
+        assert list(persistence._conversations) == ["a.ipynb", "c.ipynb"]
+        await asyncio.sleep(0.05)
+
+        persistence.get_conversation("d.ipynb")
+        assert list(persistence._conversations) == ["c.ipynb", "d.ipynb"]
+
+    @pytest.mark.asyncio
+    async def test_burst_saved_once(self, store):
+        """Test several appends in a row produce a single save with all messages."""
+        persistence.append_to_conversation("a.ipynb", [{"role": "user", "content": "1"}])
+        persistence.append_to_conversation("a.ipynb", [{"role": "user", "content": "2"}])
+
+        await asyncio.sleep(0.05)
+
+        assert len(store) == 1
+        path, messages = store[0]
+        assert path == "a.ipynb"
+        assert [m["content"] for m in messages] == ["old", "1", "2"]
+
+    @pytest.mark.asyncio
+    async def test_history_trimmed(self, store, monkeypatch):
+        """Test the cached history keeps only the most recent messages."""
+        monkeypatch.setattr(persistence, "MAX_HISTORY", 2)
+        persistence.append_to_conversation("a.ipynb", [{"role": "user", "content": "1"}, {"role": "assistant", "content": "2"}])
+
+        assert [m["content"] for m in persistence.get_conversation("a.ipynb")] == ["1", "2"]
+        await asyncio.sleep(0.05)
+
+    @pytest.mark.asyncio
+    async def test_clear_cancels_pending_save(self, store):
+        """Test clearing drops the cached history and any scheduled save."""
+        persistence.append_to_conversation("a.ipynb", [{"role": "user", "content": "1"}])
+
+        assert await persistence.clear_conversation("a.ipynb") is True
+        await asyncio.sleep(0.05)
+
+        assert store == [("a.ipynb", [])]
+        assert persistence.get_conversation("a.ipynb") == []
+
+    @pytest.mark.asyncio
+    async def test_clear_waits_for_in_flight_save(self, store, monkeypatch):
+        """Test a clear issued mid-write is applied after the write finishes."""
+        release = asyncio.Event()
+
+        async def slow_save(notebook_path, messages, serverapp=None):
+            store.append((notebook_path, messages))
+            if messages:
+                await release.wait()
+            return True
+
+        monkeypatch.setattr(persistence, "save_conversation_to_notebook", slow_save)
+        persistence.append_to_conversation("a.ipynb", [{"role": "user", "content": "1"}])
+        await asyncio.sleep(0.05)
+
+        clearing = asyncio.create_task(persistence.clear_conversation("a.ipynb"))
+        await asyncio.sleep(0.01)
+        assert len(store) == 1
+
+        release.set()
+        assert await clearing is True
+        assert [messages for _, messages in store] == [
+            [{"role": "user", "content": "old"}, {"role": "user", "content": "1"}],
+            [],
+        ]
+
+    @pytest.mark.asyncio
+    async def test_flush_pending_saves(self, store):
+        """Test flushing writes scheduled saves immediately and only once."""
+        persistence.append_to_conversation("a.ipynb", [{"role": "user", "content": "1"}])
+
+        await persistence.flush_pending_saves()
+        assert len(store) == 1
+        assert persistence._pending_saves == {}
+
+        await asyncio.sleep(0.05)
+        assert len(store) == 1
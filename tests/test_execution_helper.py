@@ -0,0 +1,350 @@
+# Copyright 2025 Alejandro Martínez Corriá and the Thinkube contributors
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Unit tests for execution output helpers."""
+
+import asyncio
+from queue import Empty
+from types import SimpleNamespace
+
+import pytest
+
+from tk_ai_extension.mcp.tools.utils import execution_helper
+from tk_ai_extension.mcp.tools.utils.execution_helper import (
+    strip_ansi_codes,
+    extract_output,
+    safe_extract_outputs,
+    format_outputs,
+    iopub_to_output,
+    execute_code_in_kernel,
+)
+
+
+class TestStripAnsiCodes:
+    """Tests for strip_ansi_codes."""
+
+    def test_plain_text_unchanged(self):
+        """Test text without escapes is returned as-is."""
+        assert strip_ansi_codes("hello world") == "hello world"
+
+    def test_strips_sgr(self):
+        """Test color codes are removed."""
+        assert strip_ansi_codes("\x1b[0;31mError\x1b[0m") == "Error"
+
+    def test_strips_cursor_and_erase(self):
+        """Test non-SGR CSI sequences are removed."""
+        assert strip_ansi_codes("\x1b[2K\x1b[1Aprogress") == "progress"
+
+    def test_strips_osc_hyperlink(self):
+        """Test OSC hyperlinks terminated by BEL or ST are removed."""
+        text = "\x1b]8;;file:///a.py\x07a.py\x1b]8;;\x1b\\"
+        assert strip_ansi_codes(text) == "a.py"
+
+
+class TestExtractOutput:
+    """Tests for extract_output."""
+
+    def test_stream(self):
+        """Test stream output text is extracted."""
+        output = {"output_type": "stream", "name": "stdout", "text": ["a\n", "b\n"]}
+        assert extract_output(output) == "a\nb\n"
+
+    def test_execute_result(self):
+        """Test text/plain is preferred for execute results."""
+        output = {"output_type": "execute_result", "data": {"text/plain": "42"}}
+        assert extract_output(output) == "42"
+
+    def test_display_data_image(self):
+        """Test image-only display data is summarised."""
+        output = {"output_type": "display_data", "data": {"image/png": "iVBOR"}}
+        assert extract_output(output) == "[Image Output (PNG)]"
+
+    def test_error_traceback(self):
+        """Test traceback lines are joined and stripped of ANSI codes."""
+        output = {
+            "output_type": "error",
+            "traceback": ["\x1b[0;31mValueError\x1b[0m", "bad value"],
+        }
+        assert extract_output(output) == "ValueError\nbad value"
+
+    def test_unknown_type(self):
+        """Test unknown output types are reported."""
+        assert extract_output({"output_type": "weird"}) == "[Unknown output type: weird]"
+
+
+class TestSafeExtractOutputs:
+    """Tests for safe_extract_outputs."""
+
+    def test_empty(self):
+        """Test empty outputs produce an empty list."""
+        assert safe_extract_outputs([]) == []
+        assert safe_extract_outputs(None) == []
+
+    def test_multiple(self):
+        """Test every non-empty output is extracted."""
+        outputs = [
+            {"output_type": "stream", "text": "hi"},
+            {"output_type": "stream", "text": ""},
+            {"output_type": "execute_result", "data": {"text/plain": "1"}},
+        ]
+        assert safe_extract_outputs(outputs) == ["hi", "1"]
+
+    def test_single_item_list(self):
+        """Test a one-element list returns its output, dropping it when empty."""
+        assert safe_extract_outputs([{"output_type": "stream", "text": "x"}]) == ["x"]
+        assert safe_extract_outputs([{"output_type": "stream", "text": ""}]) == []
+
+    def test_single_malformed_output(self):
+        """Test a malformed single output is reported instead of raising."""
+        result = safe_extract_outputs([{"output_type": "execute_result", "data": None}])
+        assert len(result) == 1
+        assert result[0].startswith("[Error extracting output:")
+
+    def test_single_dict(self):
+        """Test a bare output dict is handled."""
+        assert safe_extract_outputs({"output_type": "stream", "text": "x"}) == ["x"]
+
+
+class TestIopubToOutput:
+    """Tests for iopub_to_output."""
+
+    def test_stream(self):
+        """Test stream messages become stream outputs."""
+        output = iopub_to_output('stream', {'name': 'stderr', 'text': 'warn'})
+        assert output == {'output_type': 'stream', 'name': 'stderr', 'text': 'warn'}
+
+    def test_execute_result(self):
+        """Test execute_result keeps data, metadata and execution count."""
+        output = iopub_to_output('execute_result', {'data': {'text/plain': '1'}, 'execution_count': 3})
+        assert output == {
+            'output_type': 'execute_result',
+            'data': {'text/plain': '1'},
+            'metadata': {},
+            'execution_count': 3,
+        }
+
+    def test_error(self):
+        """Test error messages keep the traceback."""
+        output = iopub_to_output('error', {'ename': 'E', 'evalue': 'v', 'traceback': ['t']})
+        assert output == {'output_type': 'error', 'ename': 'E', 'evalue': 'v', 'traceback': ['t']}
+
+    def test_non_output_message(self):
+        """Test status and other messages produce no output."""
+        assert iopub_to_output('status', {'execution_state': 'idle'}) is None
+
+
+class TestFormatOutputs:
+    """Tests for format_outputs."""
+
+    def test_empty(self):
+        """Test empty outputs produce a placeholder."""
+        assert format_outputs([]) == ["[No output]"]
+        assert format_outputs(None) == ["[No output]"]
+
+    def test_mixed(self):
+        """Test strings, nbformat dicts, and other objects are formatted."""
+        outputs = [
+            "plain",
+            {"text": "streamed"},
+            {"data": {"text/plain": "result"}},
+            {"data": {"image/png": "x"}},
+            {"other": 1},
+            7,
+        ]
+        assert format_outputs(outputs) == [
+            "plain",
+            "streamed",
+            "result",
+            "{'image/png': 'x'}",
+            "{'other': 1}",
+            "7",
+        ]
+
+
+class TestGetServerConfig:
+    """Tests for _get_server_config."""
+
+    def test_builds_url_and_headers(self, monkeypatch):
+        """Test the URL and auth headers come from the JupyterHub environment."""
+        monkeypatch.setattr(execution_helper, "_server_config", None)
+        monkeypatch.setenv("JUPYTERHUB_API_TOKEN", "secret")
+        monkeypatch.setenv("JUPYTERHUB_SERVICE_PREFIX", "/user/alice/")
+
+        server_url, post_headers, get_headers = execution_helper._get_server_config()
+
+        assert server_url == "http://localhost:8888/user/alice/"
+        assert get_headers == {"Authorization": "token secret"}
+        assert post_headers == {"Authorization": "token secret", "Content-Type": "application/json"}
+
+    def test_missing_token_not_cached(self, monkeypatch):
+        """Test a missing token raises and is retried on the next call."""
+        monkeypatch.setattr(execution_helper, "_server_config", None)
+        monkeypatch.delenv("JUPYTERHUB_API_TOKEN", raising=False)
+
+        with pytest.raises(RuntimeError):
+            execution_helper._get_server_config()
+
+        monkeypatch.setenv("JUPYTERHUB_API_TOKEN", "later")
+        assert execution_helper._get_server_config()[2] == {"Authorization": "token later"}
+
+
+class FakeChannel:
+    """Kernel client channel backed by a list of queued messages."""
+
+    def __init__(self):
+        self.socket = object()
+        self.queue = []
+        self.sent = []
+
+    def send(self, msg):
+        self.sent.append(msg)
+
+    def get_msg(self, timeout=None):
+        if not self.queue:
+            raise Empty
+        return self.queue.pop(0)
+
+
+class FakeClient:
+    """Kernel client whose shell and IOPub channels are fed by the test."""
+
+    def __init__(self):
+        self.channels_running = False
+        self.stopped = False
+        self.shell_channel = FakeChannel()
+        self.iopub_channel = FakeChannel()
+
+    def start_channels(self):
+        self.channels_running = True
+
+    def stop_channels(self):
+        self.stopped = True
+        self.channels_running = False
+
+    def iopub(self, msg_type, content, parent="req-1"):
+        self.iopub_channel.queue.append({
+            "parent_header": {"msg_id": parent},
+            "msg_type": msg_type,
+            "content": content,
+        })
+
+    def reply(self, content):
+        self.shell_channel.queue.append({"parent_header": {"msg_id": "req-1"}, "content": content})
+
+
+class FakePoller:
+    """zmq Poller stand-in that reports whichever fake channels have messages."""
+
+    def __init__(self):
+        self.wakeups = 0
+        FakePoller.last = self
+
+    def register(self, socket, flags):
+        pass
+
+    async def poll(self, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout / 1000
+        while True:
+            ready = [(channel.socket, 1) for channel in self.channels if channel.queue]
+            if ready:
+                self.wakeups += 1
+                return ready
+            if loop.time() >= deadline:
+                return []
+            await asyncio.sleep(0.005)
+
+
+@pytest.fixture
+def kernel(monkeypatch):
+    """Wire a FakeClient into execute_code_in_kernel in place of a real kernel."""
+    import zmq.asyncio
+
+    client = FakeClient()
+    FakePoller.channels = [client.iopub_channel, client.shell_channel]
+    monkeypatch.setattr(zmq.asyncio, "Poller", FakePoller)
+
+    session = SimpleNamespace(msg=lambda msg_type, content: {"header": {"msg_id": "req-1"}})
+    lkm = SimpleNamespace(session=session, client=lambda: client)
+    kernel_manager = SimpleNamespace(
+        pinned_superclass=SimpleNamespace(get_kernel=lambda manager, kernel_id: lkm)
+    )
+    client.manager = kernel_manager
+    return client
+
+
+class TestExecuteCodeInKernel:
+    """Tests for execute_code_in_kernel against a fake kernel client."""
+
+    @pytest.mark.asyncio
+    async def test_collects_outputs(self, kernel):
+        """Test outputs for the request are collected and other parents ignored."""
+        kernel.iopub("stream", {"name": "stdout", "text": "hi\n"})
+        kernel.iopub("stream", {"name": "stdout", "text": "other\n"}, parent="req-0")
+        kernel.iopub("execute_result", {"data": {"text/plain": "3"}, "metadata": {}, "execution_count": 3})
+        kernel.reply({"status": "ok", "execution_count": 3})
+
+        count, outputs = await execute_code_in_kernel(kernel.manager, "k", "print('hi'); 3")
+
+        assert count == 3
+        assert [o["output_type"] for o in outputs] == ["stream", "execute_result"]
+        assert outputs[0]["text"] == "hi\n"
+        assert kernel.stopped
+
+    @pytest.mark.asyncio
+    async def test_timeout(self, kernel):
+        """Test a kernel that never replies yields a single stderr notice."""
+        count, outputs = await execute_code_in_kernel(kernel.manager, "k", "while True: pass", timeout=1)
+
+        assert count is None
+        assert outputs == [{
+            "output_type": "stream",
+            "name": "stderr",
+            "text": "[TIMEOUT: Code execution exceeded 1 seconds]",
+        }]
+        assert kernel.stopped
+
+    @pytest.mark.asyncio
+    async def test_missing_execution_count(self, kernel):
+        """Test a reply without an execution count raises RuntimeError."""
+        kernel.reply({"status": "ok"})
+
+        with pytest.raises(RuntimeError):
+            await execute_code_in_kernel(kernel.manager, "k", "pass")
+
+    @pytest.mark.asyncio
+    async def test_output_during_grace_period(self, kernel):
+        """Test IOPub messages arriving shortly after the shell reply are kept."""
+        kernel.reply({"status": "ok", "execution_count": 1})
+        asyncio.get_running_loop().call_later(
+            0.13, kernel.iopub, "stream", {"name": "stdout", "text": "late"}
+        )
+
+        count, outputs = await execute_code_in_kernel(kernel.manager, "k", "print('late')")
+
+        assert count == 1
+        assert outputs == [{"output_type": "stream", "name": "stdout", "text": "late"}]
+
+    @pytest.mark.asyncio
+    async def test_merges_consecutive_stream_messages(self, kernel):
+        """Test same-stream messages merge until another stream or output intervenes."""
+        for name, text in [("stdout", "a"), ("stdout", "b"), ("stderr", "E"), ("stdout", "c")]:
+            kernel.iopub("stream", {"name": name, "text": text})
+        kernel.iopub("execute_result", {"data": {"text/plain": "r"}, "metadata": {}, "execution_count": 2})
+        kernel.iopub("stream", {"name": "stdout", "text": "d"})
+        kernel.iopub("stream", {"name": "stdout", "text": "e"})
+        kernel.reply({"status": "ok", "execution_count": 2})
+
+        count, outputs = await execute_code_in_kernel(kernel.manager, "k", "...")
+
+        assert count == 2
+        assert [(o.get("name"), o.get("text")) for o in outputs] == [
+            ("stdout", "ab"),
+            ("stderr", "E"),
+            ("stdout", "c"),
+            (None, None),
+            ("stdout", "de"),
+        ]
+        assert outputs[3]["data"] == {"text/plain": "r"}
+        # Everything was queued before the first poll, so one wakeup drains it all
+        assert FakePoller.last.wakeups == 1
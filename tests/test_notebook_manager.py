@@ -0,0 +1,114 @@
+# Copyright 2025 Alejandro Martínez Corriá and the Thinkube contributors
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Unit tests for NotebookManager."""
+
+import json
+
+from tk_ai_extension.notebook_manager import NotebookManager
+
+
+class TestNotebookManager:
+    """Tests for NotebookManager."""
+
+    def test_first_notebook_becomes_current(self):
+        """Test the first added notebook is made current."""
+        manager = NotebookManager()
+        manager.add_notebook("main", {"id": "k1"}, "main.ipynb")
+
+        assert "main" in manager
+        assert manager.get_current_notebook() == "main"
+        assert manager.get_current_notebook_path() == "main.ipynb"
+        assert manager.get_current_kernel_id() == "k1"
+
+    def test_set_current_unknown(self):
+        """Test switching to an unknown notebook is rejected."""
+        manager = NotebookManager()
+        manager.add_notebook("main", {"id": "k1"}, "main.ipynb")
+
+        assert manager.set_current_notebook("other") is False
+        assert manager.get_current_notebook() == "main"
+
+    def test_remove_current_moves_pointer(self):
+        """Test removing the current notebook selects another one."""
+        manager = NotebookManager()
+        manager.add_notebook("a", {"id": "k1"}, "a.ipynb")
+        manager.add_notebook("b", {"id": "k2"}, "b.ipynb")
+
+        assert manager.remove_notebook("a") is True
+        assert manager.get_current_notebook() == "b"
+        assert manager.get_current_kernel_id() == "k2"
+
+        assert manager.remove_notebook("b") is True
+        assert manager.get_current_notebook() is None
+        assert manager.get_current_notebook_path() is None
+        assert manager.is_empty()
+
+    def test_readd_current_updates_kernel(self):
+        """Test re-adding the current notebook is reflected by the accessors."""
+        manager = NotebookManager()
+        manager.add_notebook("main", {"id": "k1"}, "main.ipynb")
+        manager.add_notebook("main", {"id": "k2"}, "moved.ipynb")
+
+        assert manager.get_current_kernel_id() == "k2"
+        assert manager.get_current_notebook_path() == "moved.ipynb"
+
+    def test_use_adds_and_sets_current(self):
+        """Test use() adds a notebook and makes it current."""
+        manager = NotebookManager()
+        manager.add_notebook("a", {"id": "k1"}, "a.ipynb")
+
+        assert manager.use("b", {"id": "k2"}, "b.ipynb") == "b.ipynb"
+        assert manager.get_current_notebook() == "b"
+        assert manager.get_kernel_id("b") == "k2"
+
+    def test_use_switches_existing(self):
+        """Test use() with only a name switches to a known notebook."""
+        manager = NotebookManager()
+        manager.add_notebook("a", {"id": "k1"}, "a.ipynb")
+        manager.add_notebook("b", {"id": "k2"}, "b.ipynb")
+
+        assert manager.use("b") == "b.ipynb"
+        assert manager.get_current_notebook() == "b"
+        assert manager.use("missing") is None
+
+    def test_list_all_notebooks(self):
+        """Test listing reports path, kernel and current flag."""
+        manager = NotebookManager()
+        manager.add_notebook("a", {"id": "k1"}, "a.ipynb")
+        manager.add_notebook("b", {"id": "k2"}, "b.ipynb")
+        manager.set_current_notebook("b")
+
+        assert manager.list_all_notebooks() == {
+            "a": {"path": "a.ipynb", "kernel_id": "k1", "is_current": False},
+            "b": {"path": "b.ipynb", "kernel_id": "k2", "is_current": True},
+        }
+
+    def test_list_all_notebooks_tracks_changes(self):
+        """Test each listing reflects switches and removals made before it."""
+        manager = NotebookManager()
+        manager.add_notebook("a", {"id": "k1"}, "a.ipynb")
+        manager.add_notebook("b", {"id": "k2"}, "b.ipynb")
+
+        manager.set_current_notebook("b")
+        listing = manager.list_all_notebooks()
+        assert listing["a"]["is_current"] is False
+        assert listing["b"]["is_current"] is True
+
+        manager.remove_notebook("b")
+        listing = manager.list_all_notebooks()
+        assert list(listing) == ["a"]
+        assert listing["a"]["is_current"] is True
+
+    def test_list_all_notebooks_is_a_copy(self):
+        """Test the listing is plain JSON-serializable data detached from the manager."""
+        manager = NotebookManager()
+        manager.add_notebook("a", {"id": "k1"}, "a.ipynb")
+        listing = manager.list_all_notebooks()
+
+        assert json.loads(json.dumps(listing)) == listing
+
+        listing["a"]["is_current"] = False
+        listing["b"] = {}
+        assert manager.list_all_notebooks()["a"]["is_current"] is True
+        assert "b" not in manager
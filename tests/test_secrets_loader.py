@@ -0,0 +1,88 @@
+# Copyright 2025 Alejandro Martínez Corriá and the Thinkube contributors
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Unit tests for .secrets.env parsing and loading."""
+
+import os
+
+import pytest
+
+from tk_ai_extension import secrets_loader
+from tk_ai_extension.secrets_loader import parse_secrets
+
+
+class TestParseSecrets:
+    """Tests for parse_secrets."""
+
+    def test_assignments(self):
+        """Test plain, exported, and quoted assignments."""
+        text = (
+            "A=1\n"
+            "export B=two\n"
+            "C = 'single quoted'\n"
+            'D="double quoted"\n'
+            "E=\n"
+            "F=  padded  \n"
+        )
+        assert parse_secrets(text) == {
+            "A": "1",
+            "B": "two",
+            "C": "single quoted",
+            "D": "double quoted",
+            "E": "",
+            "F": "padded",
+        }
+
+    def test_skipped_lines(self):
+        """Test comments, blank lines, and invalid names are ignored."""
+        assert parse_secrets("# A=1\n\n  \nnot an assignment\nKEY-1=v\n") == {}
+
+    def test_leading_tab_stripped(self):
+        """Test whitespace after '=' is not part of the value."""
+        assert parse_secrets("I=\tval\n") == {"I": "val"}
+
+    def test_quotes_only_stripped_when_enclosing(self):
+        """Test text after a closing quote keeps the value verbatim."""
+        assert parse_secrets('G="x" # c\n') == {"G": '"x" # c'}
+        assert parse_secrets('K="a\\"b"\n') == {"K": '"a\\"b"'}
+        assert parse_secrets('M=""""\n') == {"M": '""""'}
+
+    def test_later_assignment_wins(self):
+        """Test a repeated key takes its last value."""
+        assert parse_secrets("A=1\nA=2\n") == {"A": "2"}
+
+
+class TestLoadSecrets:
+    """Tests for load_secrets and the environment snapshot."""
+
+    @pytest.fixture
+    def secrets_file(self, tmp_path, monkeypatch):
+        path = tmp_path / ".secrets.env"
+        monkeypatch.setattr(secrets_loader, "SECRETS_PATH", path)
+        monkeypatch.setattr(secrets_loader, "_secrets_mtime_ns", None)
+        monkeypatch.setattr(secrets_loader, "_env_snapshot", None)
+        monkeypatch.delenv("TK_TEST_SECRET", raising=False)
+        return path
+
+    def test_missing_file(self, secrets_file):
+        """Test a missing file leaves the environment alone."""
+        secrets_loader.load_secrets()
+        assert "TK_TEST_SECRET" not in os.environ
+
+    def test_reloads_on_change(self, secrets_file, monkeypatch):
+        """Test the file is re-read and the snapshot reset only after it changes."""
+        secrets_file.write_text("TK_TEST_SECRET=one\n")
+        secrets_loader.load_secrets()
+        snapshot = secrets_loader.get_env_snapshot()
+        assert snapshot["TK_TEST_SECRET"] == "one"
+
+        monkeypatch.setenv("TK_TEST_SECRET", "edited")
+        secrets_loader.load_secrets()
+        assert os.environ["TK_TEST_SECRET"] == "edited"
+        assert secrets_loader.get_env_snapshot() is snapshot
+
+        secrets_file.write_text("TK_TEST_SECRET=two\n")
+        os.utime(secrets_file, ns=(0, secrets_file.stat().st_mtime_ns + 1))
+        secrets_loader.load_secrets()
+        assert os.environ["TK_TEST_SECRET"] == "two"
+        assert secrets_loader.get_env_snapshot()["TK_TEST_SECRET"] == "two"
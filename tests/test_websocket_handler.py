@@ -0,0 +1,106 @@
+# Copyright 2025 Alejandro Martínez Corriá and the Thinkube contributors
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Unit tests for token batching in the streaming WebSocket handler."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from tornado import websocket
+
+from tk_ai_extension import websocket_handler
+from tk_ai_extension.websocket_handler import MCPStreamingWebSocket
+
+
+@pytest.fixture
+def handler():
+    """Handler with write_message replaced by a recorder of decoded frames."""
+    ws = MCPStreamingWebSocket.__new__(MCPStreamingWebSocket)
+    ws.initialize()
+    ws.frames = []
+
+    def write_message(message):
+        ws.frames.append(json.loads(message))
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+    ws.write_message = write_message
+    return ws
+
+
+async def wait_past_flush_interval():
+    await asyncio.sleep(websocket_handler.TOKEN_FLUSH_INTERVAL * 3)
+
+
+class TestTokenBatching:
+    """Tests for _queue_token, _flush_tokens and _discard_tokens."""
+
+    @pytest.mark.asyncio
+    async def test_tokens_batched(self, handler):
+        """Test text queued within the flush interval is sent as one frame."""
+        handler._queue_token("Hel")
+        handler._queue_token("lo")
+        assert handler.frames == []
+
+        await wait_past_flush_interval()
+
+        assert handler.frames == [{"type": "token", "content": "Hello"}]
+        assert handler._token_flush_handle is None
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("frame", [
+        {"type": "tool_call", "name": "list_cells", "args": {}},
+        {"type": "tool_result", "name": "list_cells", "success": True, "result": None},
+        {"type": "done", "full_response": "ab"},
+        {"type": "error", "message": "boom"},
+    ])
+    async def test_tokens_flushed_before_frame(self, handler, frame):
+        """Test buffered text is sent ahead of any other frame."""
+        handler._queue_token("a")
+        handler._queue_token("b")
+
+        await handler._send(frame)
+        await wait_past_flush_interval()
+
+        assert handler.frames == [{"type": "token", "content": "ab"}, frame]
+        assert handler._token_flush_handle is None
+
+    @pytest.mark.asyncio
+    async def test_tokens_flushed_before_tool_events(self, handler):
+        """Test tool notifications keep their place after streamed text."""
+        handler._queue_token("thinking")
+        await handler._on_tool_use(SimpleNamespace(name="list_cells", input={}))
+        handler._queue_token("done")
+        await handler._on_tool_result_block(SimpleNamespace(name="list_cells", content="{}", is_error=False))
+
+        assert [frame["type"] for frame in handler.frames] == ["token", "tool_call", "token", "tool_result"]
+        assert [frame.get("content") for frame in handler.frames[::2]] == ["thinking", "done"]
+
+    @pytest.mark.asyncio
+    async def test_cancel_discards_pending_tokens(self, handler):
+        """Test cancelling drops buffered text and its scheduled flush."""
+        handler._queue_token("partial")
+        handler._cancel_current_request()
+
+        assert handler._token_flush_handle is None
+        await wait_past_flush_interval()
+        assert handler.frames == []
+
+    @pytest.mark.asyncio
+    async def test_closed_socket_in_timer_swallowed(self, handler):
+        """Test a flush from the timer after the socket closed doesn't raise."""
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+
+        def closed_write(message):
+            raise websocket.WebSocketClosedError()
+
+        handler.write_message = closed_write
+        handler._queue_token("late")
+        await wait_past_flush_interval()
+
+        assert errors == []
+        assert handler._token_buffer == []
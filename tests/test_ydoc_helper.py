@@ -0,0 +1,26 @@
+# Copyright 2025 Alejandro Martínez Corriá and the Thinkube contributors
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Unit tests for YDoc helper path resolution."""
+
+from types import SimpleNamespace
+
+from tk_ai_extension.mcp.tools.utils.ydoc_helper import get_notebook_path
+
+
+class TestGetNotebookPath:
+    """Tests for get_notebook_path."""
+
+    def test_absolute_path_unchanged(self):
+        """Test absolute paths are returned as-is."""
+        serverapp = SimpleNamespace(root_dir="/home/user")
+        assert get_notebook_path(serverapp, "/data/nb.ipynb") == "/data/nb.ipynb"
+
+    def test_relative_path_joined_to_root(self):
+        """Test relative paths are resolved against the server root."""
+        serverapp = SimpleNamespace(root_dir="/home/user")
+        assert get_notebook_path(serverapp, "work/nb.ipynb") == "/home/user/work/nb.ipynb"
+
+    def test_no_serverapp(self):
+        """Test relative paths are unchanged without a server app."""
+        assert get_notebook_path(None, "nb.ipynb") == "nb.ipynb"
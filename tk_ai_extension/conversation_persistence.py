@@ -5,15 +5,43 @@
 
 Save/clear use YDoc for real-time sync with JupyterLab.
 Load reads from the file (works even before YDoc has synced).
+
+Chat handlers go through get_conversation/append_to_conversation, which
+keep each notebook's history in memory and coalesce bursts of exchanges
+into one delayed save. A cached history is reloaded when the notebook file
+changes on disk, and writes for one notebook never overlap.
 """
 
+import asyncio
 import json
 import logging
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+# Number of most recent messages kept in notebook metadata
+MAX_HISTORY = 100
+
+# Seconds to wait after the last exchange before saving
+SAVE_DELAY = 1.0
+
+# Number of notebooks whose history is kept in memory
+MAX_CACHED_CONVERSATIONS = 32
+
+# notebook_path -> history as last loaded or appended by this process,
+# least recently used first
+_conversations: Dict[str, List[Dict[str, Any]]] = {}
+
+# notebook_path -> file mtime the cached history was loaded or saved at
+_conversation_mtimes: Dict[str, Optional[int]] = {}
+
+# notebook_path -> pending delayed save
+_pending_saves: Dict[str, asyncio.Task] = {}
+
+# notebook_path -> lock held while a save is being written
+_save_locks: Dict[str, asyncio.Lock] = {}
+
 
 def _resolve_notebook_path(notebook_path: str) -> Path:
     """Resolve a notebook path to an absolute path."""
@@ -28,6 +56,14 @@ def _resolve_notebook_path(notebook_path: str) -> Path:
         return Path.home() / 'thinkube' / 'notebooks' / notebook_path
 
 
+def _file_mtime_ns(notebook_path: str) -> Optional[int]:
+    """Return the notebook file's modification time, or None if it's missing."""
+    try:
+        return _resolve_notebook_path(notebook_path).stat().st_mtime_ns
+    except OSError:
+        return None
+
+
 def load_conversation_from_notebook(notebook_path: str) -> List[Dict[str, Any]]:
     """Load conversation history from notebook metadata (file-based).
 
@@ -76,7 +112,8 @@ async def save_conversation_to_notebook(notebook_path: str, messages: List[Dict[
         if not ydoc:
             # YDoc unavailable — fall back to file save
             logger.warning(f"YDoc not available for {notebook_path}, saving to file")
-            return _save_to_file(notebook_path, messages)
+            # Read-modify-write of the whole notebook; keep it off the event loop
+            return await asyncio.to_thread(_save_to_file, notebook_path, messages)
 
         # Access metadata via YDoc
         meta = ydoc._ymeta
@@ -90,7 +127,7 @@ async def save_conversation_to_notebook(notebook_path: str, messages: List[Dict[
         if 'tk_ai' not in metadata:
             metadata['tk_ai'] = {}
 
-        metadata['tk_ai']['conversation_history'] = messages[-100:]
+        metadata['tk_ai']['conversation_history'] = messages[-MAX_HISTORY:]
 
         from pycrdt import Map
         meta["metadata"] = Map(metadata)
@@ -119,7 +156,7 @@ def _save_to_file(notebook_path: str, messages: List[Dict[str, Any]]) -> bool:
         if 'tk_ai' not in notebook['metadata']:
             notebook['metadata']['tk_ai'] = {}
 
-        notebook['metadata']['tk_ai']['conversation_history'] = messages[-100:]
+        notebook['metadata']['tk_ai']['conversation_history'] = messages[-MAX_HISTORY:]
 
         with open(nb_path, 'w', encoding='utf-8') as f:
             json.dump(notebook, f, indent=1, ensure_ascii=False)
@@ -132,9 +169,113 @@ def _save_to_file(notebook_path: str, messages: List[Dict[str, Any]]) -> bool:
         return False
 
 
+def _is_busy(notebook_path: str) -> bool:
+    """Check whether a save for the notebook is scheduled or being written."""
+    lock = _save_locks.get(notebook_path)
+    return notebook_path in _pending_saves or (lock is not None and lock.locked())
+
+
+def _evict_conversations() -> None:
+    """Drop least recently used histories beyond MAX_CACHED_CONVERSATIONS.
+
+    Histories with a save in progress are kept, as is the most recent entry.
+    """
+    excess = len(_conversations) - MAX_CACHED_CONVERSATIONS
+    if excess <= 0:
+        return
+    for path in list(_conversations)[:-1]:
+        if not _is_busy(path):
+            del _conversations[path]
+            _conversation_mtimes.pop(path, None)
+            _save_locks.pop(path, None)
+            excess -= 1
+            if excess == 0:
+                break
+
+
+def get_conversation(notebook_path: str) -> List[Dict[str, Any]]:
+    """Return the conversation history, loading it from the file when needed.
+
+    The cached history is reused until the notebook file is modified, deleted
+    or recreated; while a save is pending it is kept regardless, since it holds
+    exchanges the file doesn't have yet.
+    """
+    messages = _conversations.pop(notebook_path, None)
+    if messages is not None and not _is_busy(notebook_path):
+        if _file_mtime_ns(notebook_path) != _conversation_mtimes.get(notebook_path):
+            messages = None
+    if messages is None:
+        _conversation_mtimes[notebook_path] = _file_mtime_ns(notebook_path)
+        messages = load_conversation_from_notebook(notebook_path)[-MAX_HISTORY:]
+    # Re-inserting keeps _conversations ordered by last use
+    _conversations[notebook_path] = messages
+    _evict_conversations()
+    return messages
+
+
+def append_to_conversation(notebook_path: str, new_messages: List[Dict[str, Any]], serverapp=None) -> None:
+    """Append messages to the history and schedule a save.
+
+    Saves are delayed by SAVE_DELAY and restarted on every append, so a burst
+    of exchanges is written once with the latest history.
+    """
+    messages = get_conversation(notebook_path)
+    messages.extend(new_messages)
+    del messages[:-MAX_HISTORY]
+
+    pending = _pending_saves.get(notebook_path)
+    if pending is not None and not pending.done():
+        pending.cancel()
+    _pending_saves[notebook_path] = asyncio.create_task(_save_later(notebook_path, serverapp))
+
+
+async def _save_later(notebook_path: str, serverapp) -> None:
+    """Save the cached history after SAVE_DELAY unless superseded."""
+    await asyncio.sleep(SAVE_DELAY)
+    await _save_cached(notebook_path, serverapp)
+
+
+async def _save_cached(notebook_path: str, serverapp) -> bool:
+    """Write the cached history, waiting for any save already in progress."""
+    lock = _save_locks.setdefault(notebook_path, asyncio.Lock())
+    async with lock:
+        # Detach before writing so a new append schedules a fresh save instead
+        # of cancelling this one mid-write
+        if _pending_saves.get(notebook_path) is asyncio.current_task():
+            del _pending_saves[notebook_path]
+        messages = list(_conversations.get(notebook_path, []))
+        saved = await save_conversation_to_notebook(notebook_path, messages, serverapp)
+        if saved and notebook_path in _conversations:
+            _conversation_mtimes[notebook_path] = _file_mtime_ns(notebook_path)
+        return saved
+
+
+async def flush_pending_saves(serverapp=None) -> None:
+    """Write every delayed save now and wait for saves in progress.
+
+    Called when the server stops so recent exchanges aren't lost.
+    """
+    pending = list(_pending_saves.items())
+    _pending_saves.clear()
+    for notebook_path, task in pending:
+        task.cancel()
+        await _save_cached(notebook_path, serverapp)
+    for lock in list(_save_locks.values()):
+        async with lock:
+            pass
+
+
 async def clear_conversation(notebook_path: str, serverapp=None) -> bool:
-    """Clear conversation history."""
-    return await save_conversation_to_notebook(notebook_path, [], serverapp)
+    """Clear conversation history.
+
+    A save already being written finishes first, so it can't overwrite the
+    cleared history.
+    """
+    pending = _pending_saves.pop(notebook_path, None)
+    if pending is not None:
+        pending.cancel()
+    _conversations[notebook_path] = []
+    return await _save_cached(notebook_path, serverapp)
 
 
 def get_notebook_name(notebook_path: str) -> str:
@@ -43,6 +43,11 @@ class TKAIExtension(ExtensionApp):
             # Register MCP tools
             self._register_tools()
 
+            # The tool set is fixed once registered, so build the MCP server once
+            from .agent.tools_registry import create_jupyter_mcp_server, get_allowed_tool_names
+            self.settings['jupyter_mcp_server'] = create_jupyter_mcp_server()
+            self.settings['allowed_tool_names'] = get_allowed_tool_names()
+
             # Initialize persistent Claude client manager
             from .client_manager import ClaudeClientManager
             client_manager = ClaudeClientManager()
@@ -55,6 +60,11 @@ class TKAIExtension(ExtensionApp):
             self.log.error(f"tk-ai-extension: Failed to initialize: {e}")
             raise
 
+    async def stop_extension(self):
+        """Write conversation saves that are still waiting out their delay."""
+        from .conversation_persistence import flush_pending_saves
+        await flush_pending_saves(self.serverapp)
+
     def _register_tools(self):
         """Register all MCP tools with Claude Agent SDK."""
         from .agent.tools_registry import register_tool
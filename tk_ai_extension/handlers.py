@@ -9,29 +9,7 @@ from pathlib import Path
 from tornado import web
 from jupyter_server.base.handlers import JupyterHandler
 
-
-def load_secrets():
-    """Load secrets from .secrets.env file into environment."""
-    secrets_path = Path.home() / 'thinkube' / 'notebooks' / '.secrets.env'
-    if secrets_path.exists():
-        try:
-            with open(secrets_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    # Skip comments and empty lines
-                    if not line or line.startswith('#'):
-                        continue
-                    # Parse export statements
-                    if line.startswith('export '):
-                        line = line[7:]  # Remove 'export '
-                    # Split on first = only
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        # Remove quotes if present
-                        value = value.strip('"').strip("'")
-                        os.environ[key] = value
-        except Exception as e:
-            print(f"Warning: Failed to load secrets from {secrets_path}: {e}")
+from .secrets_loader import load_secrets
 
 
 class MCPHealthHandler(JupyterHandler):
@@ -291,13 +269,16 @@ class MCPChatHandler(JupyterHandler):
                 })
                 return
 
-            # Get Jupyter MCP server with tools
-            from .agent.tools_registry import create_jupyter_mcp_server, get_allowed_tool_names
+            # Get Jupyter MCP server with tools (built once at extension startup)
+            jupyter_mcp = self.settings.get('jupyter_mcp_server')
+            allowed_tools = self.settings.get('allowed_tool_names')
+            if jupyter_mcp is None or allowed_tools is None:
+                from .agent.tools_registry import create_jupyter_mcp_server, get_allowed_tool_names
 
-            self.log.info("Creating Jupyter MCP server...")
-            jupyter_mcp = create_jupyter_mcp_server()
-            allowed_tools = get_allowed_tool_names()
-            self.log.info(f"MCP server created with {len(allowed_tools)} tools")
+                self.log.info("Creating Jupyter MCP server...")
+                jupyter_mcp = create_jupyter_mcp_server()
+                allowed_tools = get_allowed_tool_names()
+            self.log.info(f"Using Jupyter MCP server with {len(allowed_tools)} tools")
 
             # Configure Claude options with MCP server
             # Set working directory to user's notebooks for Claude CLI context
@@ -352,23 +333,17 @@ class MCPChatHandler(JupyterHandler):
 
             # Save conversation to notebook metadata via YDoc
             try:
-                from .conversation_persistence import save_conversation_to_notebook, load_conversation_from_notebook
-
-                # Load existing conversation
-                existing_messages = load_conversation_from_notebook(notebook_path)
-
-                # Append new exchange
-                updated_messages = existing_messages + [
-                    {"role": "user", "content": user_message},
-                    {"role": "assistant", "content": response_text}
-                ]
+                from .conversation_persistence import append_to_conversation
 
                 # Get serverapp for YDoc access
                 serverapp = self.settings.get('serverapp')
 
-                # Save back to notebook via YDoc (no file operations)
-                await save_conversation_to_notebook(notebook_path, updated_messages, serverapp)
-                self.log.info(f"Conversation saved to {notebook_path} via YDoc")
+                # Append new exchange; saved to the notebook via YDoc shortly after
+                append_to_conversation(notebook_path, [
+                    {"role": "user", "content": user_message},
+                    {"role": "assistant", "content": response_text}
+                ], serverapp)
+                self.log.info(f"Conversation save scheduled for {notebook_path}")
             except Exception as e:
                 self.log.warning(f"Failed to save conversation: {e}")
                 # Don't fail the request if saving fails
@@ -467,7 +442,7 @@ class NotebookConnectHandler(JupyterHandler):
                 return
 
             # Extract notebook name from path
-            from .conversation_persistence import get_notebook_name, load_conversation_from_notebook
+            from .conversation_persistence import get_notebook_name, get_conversation
 
             notebook_name = get_notebook_name(notebook_path)
 
@@ -512,7 +487,7 @@ class NotebookConnectHandler(JupyterHandler):
                 self.log.info(f"Connected to notebook {notebook_name}, kernel: {kernel_id}")
 
             # Load conversation history from notebook metadata
-            messages = load_conversation_from_notebook(notebook_path)
+            messages = get_conversation(notebook_path)
             self.log.info(f"Loaded {len(messages)} messages from {notebook_name}")
 
             self.finish({
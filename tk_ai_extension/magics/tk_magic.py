@@ -7,6 +7,8 @@ import os
 from IPython.core.magic import Magics, cell_magic, magics_class
 from IPython.display import display, Markdown
 
+from ..secrets_loader import parse_secrets
+
 
 @magics_class
 class TKMagics(Magics):
@@ -23,20 +25,7 @@ class TKMagics(Magics):
         if os.path.exists(secrets_path):
             try:
                 with open(secrets_path, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        # Skip comments and empty lines
-                        if not line or line.startswith('#'):
-                            continue
-                        # Parse export statements
-                        if line.startswith('export '):
-                            line = line[7:]  # Remove 'export '
-                        # Split on first = only
-                        if '=' in line:
-                            key, value = line.split('=', 1)
-                            # Remove quotes if present
-                            value = value.strip('"').strip("'")
-                            os.environ[key] = value
+                    os.environ.update(parse_secrets(f.read()))
             except Exception as e:
                 self.shell.system(
                     f'echo "⚠️  Warning: Failed to load secrets from {secrets_path}: {e}"'
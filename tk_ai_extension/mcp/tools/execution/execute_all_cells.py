@@ -8,7 +8,7 @@ import uuid
 import asyncio
 from typing import Any, Optional, Dict, List
 from ..base import BaseTool
-from ..utils import get_jupyter_ydoc
+from ..utils import get_jupyter_ydoc, execute_code_in_kernel
 
 logger = logging.getLogger(__name__)
 
@@ -147,7 +147,7 @@ class ExecuteAllCellsTool(BaseTool):
                     else:
                         source = str(source_raw)
 
-                    if source.strip():  # Skip empty cells
+                    if source and not source.isspace():  # Skip empty cells
                         code_cells.append((idx, source))
 
             if not code_cells:
@@ -293,101 +293,13 @@ class ExecuteAllCellsTool(BaseTool):
         kernel_manager: Any,
         code: str
     ) -> List[Dict[str, Any]]:
-        """Execute code in kernel (same as execute_cell_async)."""
-        import asyncio
-        import zmq.asyncio
-        from inspect import isawaitable
-
+        """Execute code in kernel, reporting failures as a stderr output."""
         try:
-            lkm = kernel_manager.pinned_superclass.get_kernel(kernel_manager, kernel_id)
-            session = lkm.session
-            client = lkm.client()
-
-            if not client.channels_running:
-                client.start_channels()
-                await asyncio.sleep(0.1)
-
-            shell_channel = client.shell_channel
-            msg_id = session.msg("execute_request", {
-                "code": code,
-                "silent": False,
-                "store_history": True,
-                "user_expressions": {},
-                "allow_stdin": False,
-                "stop_on_error": False
-            })
-            shell_channel.send(msg_id)
-
-            await asyncio.sleep(0.01)
-
-            outputs = []
-            execution_done = False
-            grace_period_ms = 100
-
-            poller = zmq.asyncio.Poller()
-            iopub_socket = client.iopub_channel.socket
-            shell_socket = shell_channel.socket
-            poller.register(iopub_socket, zmq.POLLIN)
-            poller.register(shell_socket, zmq.POLLIN)
-
-            execution_done_time = None
-
-            while not execution_done or (execution_done_time and (asyncio.get_event_loop().time() - execution_done_time) * 1000 < grace_period_ms):
-                if execution_done and execution_done_time and (asyncio.get_event_loop().time() - execution_done_time) * 1000 >= grace_period_ms:
-                    break
-
-                poll_timeout = grace_period_ms / 2 if execution_done else 1000
-                events = dict(await poller.poll(poll_timeout))
-
-                if not events:
-                    continue
-
-                if iopub_socket in events:
-                    msg = client.iopub_channel.get_msg(timeout=0)
-                    if isawaitable(msg):
-                        msg = await msg
-
-                    if msg and msg.get('parent_header', {}).get('msg_id') == msg_id['header']['msg_id']:
-                        msg_type = msg.get('msg_type')
-                        content = msg.get('content', {})
-
-                        if msg_type == 'stream':
-                            outputs.append({
-                                'output_type': 'stream',
-                                'name': content.get('name', 'stdout'),
-                                'text': content.get('text', '')
-                            })
-                        elif msg_type == 'execute_result':
-                            outputs.append({
-                                'output_type': 'execute_result',
-                                'data': content.get('data', {}),
-                                'metadata': content.get('metadata', {}),
-                                'execution_count': content.get('execution_count')
-                            })
-                        elif msg_type == 'display_data':
-                            outputs.append({
-                                'output_type': 'display_data',
-                                'data': content.get('data', {}),
-                                'metadata': content.get('metadata', {})
-                            })
-                        elif msg_type == 'error':
-                            outputs.append({
-                                'output_type': 'error',
-                                'ename': content.get('ename', ''),
-                                'evalue': content.get('evalue', ''),
-                                'traceback': content.get('traceback', [])
-                            })
-
-                if shell_socket in events:
-                    reply = client.shell_channel.get_msg(timeout=0)
-                    if isawaitable(reply):
-                        reply = await reply
-
-                    if reply and reply.get('parent_header', {}).get('msg_id') == msg_id['header']['msg_id']:
-                        execution_done = True
-                        execution_done_time = asyncio.get_event_loop().time()
-
-            client.stop_channels()
+            _, outputs = await execute_code_in_kernel(
+                kernel_manager=kernel_manager,
+                kernel_id=kernel_id,
+                code=code
+            )
             return outputs
 
         except Exception as e:
@@ -7,9 +7,9 @@ import logging
 import uuid
 import asyncio
 from pathlib import Path
-from typing import Any, Optional, Dict, List
+from typing import Any, Optional, Dict
 from ..base import BaseTool
-from ..utils import get_jupyter_ydoc
+from ..utils import get_jupyter_ydoc, execute_code_in_kernel
 
 logger = logging.getLogger(__name__)
 
@@ -219,10 +219,9 @@ class ExecuteCellAsyncTool(BaseTool):
             serverapp.log.info(f"Async execution {execution_id}: Starting cell {cell_index} execution")
 
             # Execute code using kernel directly (no timeout for async)
-            execution_count, outputs = await self._execute_code(
-                serverapp=serverapp,
-                kernel_id=kernel_id,
+            execution_count, outputs = await execute_code_in_kernel(
                 kernel_manager=kernel_manager,
+                kernel_id=kernel_id,
                 code=source
             )
 
@@ -247,141 +246,3 @@ class ExecuteCellAsyncTool(BaseTool):
             serverapp.log.error(f"Async execution {execution_id}: Error: {e}", exc_info=True)
             _async_executions[execution_id]["status"] = "error"
             _async_executions[execution_id]["error"] = str(e)
-
-    async def _execute_code(
-        self,
-        serverapp: Any,
-        kernel_id: str,
-        kernel_manager: Any,
-        code: str
-    ) -> tuple[int, List[Dict[str, Any]]]:
-        """Execute code in kernel and collect outputs (no timeout for async).
-
-        Returns:
-            Tuple of (execution_count, outputs) where execution_count is from the kernel
-
-        Adapted from ExecuteCellTool._execute_code but without timeout.
-        """
-        import asyncio
-        import zmq.asyncio
-        from inspect import isawaitable
-
-        try:
-            # Get the kernel using pinned_superclass pattern
-            lkm = kernel_manager.pinned_superclass.get_kernel(kernel_manager, kernel_id)
-            session = lkm.session
-            client = lkm.client()
-
-            # Ensure channels are started
-            if not client.channels_running:
-                client.start_channels()
-                await asyncio.sleep(0.1)
-
-            # Send execute request on shell channel
-            shell_channel = client.shell_channel
-            msg_id = session.msg("execute_request", {
-                "code": code,
-                "silent": False,
-                "store_history": True,
-                "user_expressions": {},
-                "allow_stdin": False,
-                "stop_on_error": False
-            })
-            shell_channel.send(msg_id)
-
-            await asyncio.sleep(0.01)
-
-            # Prepare to collect outputs and execution count
-            outputs = []
-            execution_count = None
-            execution_done = False
-            grace_period_ms = 100
-
-            # Poll for messages (no timeout for async execution)
-            poller = zmq.asyncio.Poller()
-            iopub_socket = client.iopub_channel.socket
-            shell_socket = shell_channel.socket
-            poller.register(iopub_socket, zmq.POLLIN)
-            poller.register(shell_socket, zmq.POLLIN)
-
-            execution_done_time = None
-
-            while not execution_done or (execution_done_time and (asyncio.get_event_loop().time() - execution_done_time) * 1000 < grace_period_ms):
-                # If execution is done and grace period expired, exit
-                if execution_done and execution_done_time and (asyncio.get_event_loop().time() - execution_done_time) * 1000 >= grace_period_ms:
-                    break
-
-                # Use shorter poll timeout during grace period
-                poll_timeout = grace_period_ms / 2 if execution_done else 1000
-                events = dict(await poller.poll(poll_timeout))
-
-                if not events:
-                    continue
-
-                # Process IOPub messages BEFORE shell
-                if iopub_socket in events:
-                    msg = client.iopub_channel.get_msg(timeout=0)
-                    if isawaitable(msg):
-                        msg = await msg
-
-                    if msg and msg.get('parent_header', {}).get('msg_id') == msg_id['header']['msg_id']:
-                        msg_type = msg.get('msg_type')
-                        content = msg.get('content', {})
-
-                        # Collect output messages
-                        if msg_type == 'stream':
-                            outputs.append({
-                                'output_type': 'stream',
-                                'name': content.get('name', 'stdout'),
-                                'text': content.get('text', '')
-                            })
-                        elif msg_type == 'execute_result':
-                            # Capture execution count from kernel
-                            if execution_count is None:
-                                execution_count = content.get('execution_count')
-                            outputs.append({
-                                'output_type': 'execute_result',
-                                'data': content.get('data', {}),
-                                'metadata': content.get('metadata', {}),
-                                'execution_count': content.get('execution_count')
-                            })
-                        elif msg_type == 'display_data':
-                            outputs.append({
-                                'output_type': 'display_data',
-                                'data': content.get('data', {}),
-                                'metadata': content.get('metadata', {})
-                            })
-                        elif msg_type == 'error':
-                            outputs.append({
-                                'output_type': 'error',
-                                'ename': content.get('ename', ''),
-                                'evalue': content.get('evalue', ''),
-                                'traceback': content.get('traceback', [])
-                            })
-
-                # Check for shell reply (execution complete)
-                if shell_socket in events:
-                    reply = client.shell_channel.get_msg(timeout=0)
-                    if isawaitable(reply):
-                        reply = await reply
-
-                    if reply and reply.get('parent_header', {}).get('msg_id') == msg_id['header']['msg_id']:
-                        execution_done = True
-                        execution_done_time = asyncio.get_event_loop().time()
-                        # Capture execution_count from shell reply if not already captured
-                        if execution_count is None:
-                            reply_content = reply.get('content', {})
-                            execution_count = reply_content.get('execution_count')
-
-            # Clean up
-            client.stop_channels()
-
-            # Kernel must return execution_count - fail if it doesn't
-            if execution_count is None:
-                raise RuntimeError("Kernel did not return execution_count in shell reply")
-
-            return (execution_count, outputs)
-
-        except Exception as e:
-            serverapp.log.error(f"Error executing code: {e}", exc_info=True)
-            raise
@@ -90,20 +90,49 @@ Examples:
             (success, error_message) tuple
         """
         path = Path(notebook_path)
+
+        # Only the model is needed here - never list the parent directory,
+        # which serialises every entry for directories with many notebooks
+        if mode == "connect":
+            try:
+                await contents_manager.get(notebook_path, content=False)
+            except Exception:
+                return False, f"'{notebook_path}' not found. Please check the notebook exists."
+            return True, None
+
+        parent_path = str(path.parent) if str(path.parent) != "." else ""
         try:
-            parent_path = str(path.parent) if str(path.parent) != "." else ""
+            if await contents_manager.dir_exists(parent_path):
+                return True, None
+            error = "directory does not exist"
+        except Exception as e:
+            error = e
+        parent_dir = parent_path or "root directory"
+        return False, f"'{parent_dir}' not found: {error}"
 
-            model = await contents_manager.get(parent_path, content=True, type='directory')
+    async def _find_session_kernel_id(
+        self,
+        session_manager: Optional[Any],
+        notebook_path: str
+    ) -> Optional[str]:
+        """Find the kernel of the JupyterLab session that has the notebook open.
 
-            if mode == "connect":
-                file_exists = any(item['name'] == path.name for item in model.get('content', []))
-                if not file_exists:
-                    return False, f"'{notebook_path}' not found. Please check the notebook exists."
+        Args:
+            session_manager: Jupyter session manager
+            notebook_path: Notebook path to look up
 
-            return True, None
-        except Exception as e:
-            parent_dir = str(path.parent) if str(path.parent) != "." else "root directory"
-            return False, f"'{parent_dir}' not found: {e}"
+        Returns:
+            Kernel ID, or None if no session exists for the notebook
+        """
+        if not session_manager:
+            return None
+        sessions = await session_manager.list_sessions()
+        for session in sessions:
+            if session.get('path') == notebook_path or session.get('name') == notebook_path:
+                existing_kernel_id = session.get('kernel', {}).get('id')
+                logger.info(f"Found existing session with kernel '{existing_kernel_id}' for notebook '{notebook_path}'")
+                return existing_kernel_id
+        return None
 
     async def execute(
         self,
@@ -150,8 +179,7 @@ Examples:
                 return f"Notebook '{notebook_name}' is not connected. Please provide a notebook_path to connect to it first."
 
             # Switch to the existing notebook
-            notebook_manager.set_current_notebook(notebook_name)
-            current_path = notebook_manager.get_current_notebook_path()
+            current_path = notebook_manager.use(notebook_name)
             return f"Successfully switched to notebook '{notebook_name}' at {current_path}."
 
         # Case 2: Notebook already connected with this name
@@ -159,8 +187,26 @@ Examples:
             return f"Notebook '{notebook_name}' is already connected. Use a different name or call unuse_notebook first if you want to reconnect."
 
         # Case 3: Connect to or create new notebook
-        # Check the path exists (or parent exists for create mode)
-        path_ok, error_msg = await self._check_path_exists(contents_manager, notebook_path, mode)
+        # Check the path exists (or parent exists for create mode). When connecting
+        # without an explicit kernel, the session lookup doesn't depend on the
+        # check, so run both concurrently.
+        session_lookup = None
+        session_looked_up = mode == "connect" and not kernel_id
+        if session_looked_up:
+            # Only a failed session lookup is reported as a result; errors from
+            # the path check propagate as they do when it runs on its own
+            async def find_session_kernel_id():
+                try:
+                    return await self._find_session_kernel_id(session_manager, notebook_path)
+                except Exception as e:
+                    return e
+
+            (path_ok, error_msg), session_lookup = await asyncio.gather(
+                self._check_path_exists(contents_manager, notebook_path, mode),
+                find_session_kernel_id()
+            )
+        else:
+            path_ok, error_msg = await self._check_path_exists(contents_manager, notebook_path, mode)
         if not path_ok:
             return f"Error: {error_msg}"
 
@@ -181,17 +227,14 @@ Examples:
             logger.info(f"Connected to existing kernel '{kernel_id}'")
         else:
             # Find the existing session for this notebook
-            existing_kernel_id = None
-            if session_manager:
+            if not session_looked_up:
                 try:
-                    sessions = await session_manager.list_sessions()
-                    for session in sessions:
-                        if session.get('path') == notebook_path or session.get('name') == notebook_path:
-                            existing_kernel_id = session.get('kernel', {}).get('id')
-                            logger.info(f"Found existing session with kernel '{existing_kernel_id}' for notebook '{notebook_path}'")
-                            break
+                    session_lookup = await self._find_session_kernel_id(session_manager, notebook_path)
                 except Exception as e:
-                    return f"Failed to list sessions: {e}"
+                    session_lookup = e
+            if isinstance(session_lookup, Exception):
+                return f"Failed to list sessions: {session_lookup}"
+            existing_kernel_id = session_lookup
 
             if not existing_kernel_id:
                 return f"No existing kernel found for notebook '{notebook_path}'. The notebook must be opened in JupyterLab first."
@@ -204,15 +247,8 @@ Examples:
         # Don't create a new session - use the existing one
         # The session already exists since we found the kernel from it
 
-        # Add notebook to manager
-        notebook_manager.add_notebook(
-            notebook_name,
-            kernel_info,
-            notebook_path
-        )
-
-        # Set as current notebook
-        notebook_manager.set_current_notebook(notebook_name)
+        # Add notebook to manager and set it as current
+        notebook_manager.use(notebook_name, kernel_info, notebook_path)
 
         # Return success message
         return f"Successfully connected to notebook '{notebook_name}' at '{notebook_path}' with existing kernel {kernel_id}."
@@ -7,7 +7,7 @@ import logging
 from typing import Any, Optional
 
 from .ydoc_helper import get_jupyter_ydoc, get_notebook_path
-from .execution_helper import execute_code_with_timeout, format_outputs
+from .execution_helper import execute_code_with_timeout, execute_code_in_kernel, format_outputs
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +30,7 @@ __all__ = [
     'get_jupyter_ydoc',
     'get_notebook_path',
     'execute_code_with_timeout',
+    'execute_code_in_kernel',
     'format_outputs',
     'resolve_kernel_id',
 ]
@@ -5,17 +5,81 @@
 """Helper functions for code execution and output formatting."""
 
 import asyncio
+import functools
+import json
 import logging
+import os
 import re
-from typing import List, Any, Optional, Union
+from typing import List, Any, Dict, Optional, Tuple, Union
+
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# CSI sequences (colors, cursor movement, erase) and OSC sequences (e.g. hyperlinks
+# terminated by BEL or ST) in a single alternation, so one pass removes them all.
+_ANSI_RE = re.compile(r'\x1b(?:\[[0-?]*[ -/]*[@-~]|\].*?(?:\x07|\x1b\\))')
+
 
 def strip_ansi_codes(text: str) -> str:
     """Remove ANSI escape sequences from text."""
-    ansi_escape = re.compile(r'\x1b\[[0-9;]*m')
-    return ansi_escape.sub('', text)
+    # Most output has no escapes at all; a substring check is far cheaper than a regex scan
+    if '\x1b' not in text:
+        return text
+    return _ANSI_RE.sub('', text)
+
+
+def _extract_stream(output: Dict[str, Any]) -> str:
+    text = output.get("text", "")
+    if isinstance(text, list):
+        text = ''.join(text)
+    elif not isinstance(text, str):
+        text = str(text)
+    return strip_ansi_codes(text)
+
+
+def _extract_data(output: Dict[str, Any]) -> str:
+    # text/plain is almost always present, so subscript directly and only
+    # fall back to inspecting the bundle when it's missing
+    try:
+        plain_text = output["data"]["text/plain"]
+    except KeyError:
+        data = output.get("data", {})
+    else:
+        if not isinstance(plain_text, str):
+            plain_text = str(plain_text)
+        return strip_ansi_codes(plain_text)
+    if "text/html" in data:
+        return "[HTML Output]"
+    elif "image/png" in data:
+        return "[Image Output (PNG)]"
+    else:
+        return f"[{output['output_type']} Data: keys={list(data.keys())}]"
+
+
+def _extract_error(output: Dict[str, Any]) -> str:
+    traceback = output.get("traceback", [])
+    if isinstance(traceback, list):
+        # Join first so the whole traceback is stripped in one regex pass
+        return strip_ansi_codes('\n'.join(str(line) for line in traceback))
+    else:
+        return strip_ansi_codes(str(traceback))
+
+
+# output_type -> text extractor for nbformat output dicts
+_OUTPUT_EXTRACTORS = {
+    "stream": _extract_stream,
+    "display_data": _extract_data,
+    "execute_result": _extract_data,
+    "error": _extract_error,
+}
 
 
 def extract_output(output: Union[dict, Any]) -> str:
@@ -29,44 +93,17 @@ def extract_output(output: Union[dict, Any]) -> str:
     """
     # Handle lists (common in error tracebacks)
     if isinstance(output, list):
-        return '\n'.join(extract_output(item) for item in output)
+        return '\n'.join(map(extract_output, output))
 
     # Handle non-dict output
     if not isinstance(output, dict):
         return strip_ansi_codes(str(output))
 
     output_type = output.get("output_type")
-
-    if output_type == "stream":
-        text = output.get("text", "")
-        if isinstance(text, list):
-            text = ''.join(text)
-        return strip_ansi_codes(str(text))
-
-    elif output_type in ["display_data", "execute_result"]:
-        data = output.get("data", {})
-        if "text/plain" in data:
-            plain_text = data["text/plain"]
-            return strip_ansi_codes(str(plain_text))
-        elif "text/html" in data:
-            return "[HTML Output]"
-        elif "image/png" in data:
-            return "[Image Output (PNG)]"
-        else:
-            return f"[{output_type} Data: keys={list(data.keys())}]"
-
-    elif output_type == "error":
-        traceback = output.get("traceback", [])
-        if isinstance(traceback, list):
-            clean_traceback = []
-            for line in traceback:
-                clean_traceback.append(strip_ansi_codes(str(line)))
-            return '\n'.join(clean_traceback)
-        else:
-            return strip_ansi_codes(str(traceback))
-
-    else:
+    extractor = _OUTPUT_EXTRACTORS.get(output_type)
+    if extractor is None:
         return f"[Unknown output type: {output_type}]"
+    return extractor(output)
 
 
 def safe_extract_outputs(outputs: Any) -> List[str]:
@@ -81,10 +118,21 @@ def safe_extract_outputs(outputs: Any) -> List[str]:
     if not outputs:
         return []
 
+    # Fast path: most cells produce a single output
+    if isinstance(outputs, list) and len(outputs) == 1:
+        try:
+            extracted = extract_output(outputs[0])
+        except Exception as e:
+            return [f"[Error extracting output: {str(e)}]"]
+        return [extracted] if extracted else []
+
     result = []
 
-    # Handle list of outputs
-    if hasattr(outputs, '__iter__') and not isinstance(outputs, (str, dict)):
+    # Handle list of outputs; the isinstance check covers the JSON-decoded
+    # case without the attribute lookup other iterables need
+    if isinstance(outputs, (list, tuple)) or (
+        hasattr(outputs, '__iter__') and not isinstance(outputs, (str, bytes, dict))
+    ):
         try:
             for output in outputs:
                 extracted = extract_output(output)
@@ -101,6 +149,296 @@ def safe_extract_outputs(outputs: Any) -> List[str]:
     return result
 
 
+def _stream_output(content: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'output_type': 'stream',
+        'name': content.get('name', 'stdout'),
+        'text': content.get('text', '')
+    }
+
+
+def _execute_result_output(content: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'output_type': 'execute_result',
+        'data': content.get('data', {}),
+        'metadata': content.get('metadata', {}),
+        'execution_count': content.get('execution_count')
+    }
+
+
+def _display_data_output(content: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'output_type': 'display_data',
+        'data': content.get('data', {}),
+        'metadata': content.get('metadata', {})
+    }
+
+
+def _error_output(content: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'output_type': 'error',
+        'ename': content.get('ename', ''),
+        'evalue': content.get('evalue', ''),
+        'traceback': content.get('traceback', [])
+    }
+
+
+# IOPub message type -> nbformat output builder. Looked up once per message
+# instead of walking an if/elif chain of string comparisons.
+_IOPUB_OUTPUT_BUILDERS = {
+    'stream': _stream_output,
+    'execute_result': _execute_result_output,
+    'display_data': _display_data_output,
+    'error': _error_output,
+}
+
+
+def iopub_to_output(msg_type: str, content: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Convert an IOPub message into an nbformat output dict.
+
+    Args:
+        msg_type: IOPub message type
+        content: IOPub message content
+
+    Returns:
+        nbformat output dict, or None if the message type produces no output
+    """
+    builder = _IOPUB_OUTPUT_BUILDERS.get(msg_type)
+    if builder is None:
+        return None
+    return builder(content)
+
+
+async def execute_code_in_kernel(
+    kernel_manager: Any,
+    kernel_id: str,
+    code: str,
+    timeout: int = 0
+) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+    """Execute code on a kernel's own client channels and collect nbformat outputs.
+
+    Adapted from jupyter-mcp-server's execute_code_local(). Shared by the
+    execute_cell, execute_cell_async and execute_all_cells tools.
+
+    Args:
+        kernel_manager: Jupyter kernel manager
+        kernel_id: Kernel ID to execute in
+        code: Code to execute
+        timeout: Maximum time to wait for execution in seconds. 0 means no timeout.
+
+    Returns:
+        Tuple of (execution_count, outputs) where execution_count is from the kernel.
+        On timeout, execution_count is None and outputs holds a single stderr notice.
+
+    Raises:
+        RuntimeError: If the kernel doesn't report an execution count
+    """
+    import zmq.asyncio
+    from inspect import isawaitable
+    from queue import Empty
+
+    try:
+        # Get the kernel using pinned_superclass pattern
+        lkm = kernel_manager.pinned_superclass.get_kernel(kernel_manager, kernel_id)
+        session = lkm.session
+        client = lkm.client()
+
+        # Ensure channels are started (critical for receiving IOPub messages!)
+        if not client.channels_running:
+            client.start_channels()
+            # Wait for channels to be ready
+            await asyncio.sleep(0.1)
+
+        # Send execute request on shell channel
+        shell_channel = client.shell_channel
+        msg_id = session.msg("execute_request", {
+            "code": code,
+            "silent": False,
+            "store_history": True,
+            "user_expressions": {},
+            "allow_stdin": False,
+            "stop_on_error": False
+        })
+        shell_channel.send(msg_id)
+        parent_msg_id = msg_id['header']['msg_id']
+
+        # Prepare to collect outputs and execution count
+        outputs = []
+        # Text chunks of the trailing stream output; consecutive messages on the
+        # same stream are merged into one output and joined once
+        stream_parts = None
+        execution_count = None
+        execution_done = False
+        grace_period_ms = 100  # Wait 100ms after shell reply for remaining IOPub messages
+        execution_done_time = None
+
+        # Poll for messages with timeout
+        poller = zmq.asyncio.Poller()
+        iopub_socket = client.iopub_channel.socket
+        shell_socket = shell_channel.socket
+        poller.register(iopub_socket, zmq.POLLIN)
+        poller.register(shell_socket, zmq.POLLIN)
+
+        timeout_ms = timeout * 1000 if timeout > 0 else 0  # 0 = no timeout
+        now = asyncio.get_running_loop().time
+        start_time = now()
+
+        while not execution_done or (execution_done_time and (now() - execution_done_time) * 1000 < grace_period_ms):
+            elapsed_ms = (now() - start_time) * 1000
+
+            # If execution is done and grace period expired, exit
+            if execution_done and execution_done_time and (now() - execution_done_time) * 1000 >= grace_period_ms:
+                break
+
+            # Check timeout (only if timeout > 0)
+            if timeout_ms > 0:
+                remaining_ms = max(0, timeout_ms - elapsed_ms)
+                if remaining_ms <= 0:
+                    client.stop_channels()
+                    logger.warning(f"Code execution timeout after {timeout}s, collected {len(outputs)} outputs")
+                    return (None, [{
+                        "output_type": "stream",
+                        "name": "stderr",
+                        "text": f"[TIMEOUT: Code execution exceeded {timeout} seconds]"
+                    }])
+            else:
+                remaining_ms = 60000  # Poll in 60s chunks when no timeout
+
+            # Use shorter poll timeout during grace period
+            poll_timeout = min(remaining_ms, grace_period_ms / 2) if execution_done else min(remaining_ms, 60000)
+            events = dict(await poller.poll(poll_timeout))
+
+            if not events:
+                continue  # No messages, continue polling
+
+            # Process IOPub messages BEFORE shell to collect outputs before marking done
+            if iopub_socket in events:
+                # Drain every message already queued so a burst of output costs
+                # one poller wakeup instead of one per message
+                while True:
+                    try:
+                        msg = client.iopub_channel.get_msg(timeout=0)
+                        if isawaitable(msg):
+                            msg = await msg
+                    except Empty:
+                        break
+
+                    if msg['parent_header'].get('msg_id') == parent_msg_id:
+                        msg_type = msg['msg_type']
+                        content = msg['content']
+
+                        # Capture execution count from kernel
+                        if msg_type == 'execute_result' and execution_count is None:
+                            execution_count = content.get('execution_count')
+
+                        # Collect output messages
+                        if (msg_type == 'stream' and stream_parts is not None
+                                and outputs[-1]['name'] == content.get('name', 'stdout')):
+                            stream_parts.append(content.get('text', ''))
+                            continue
+
+                        output = iopub_to_output(msg_type, content)
+                        if output is not None:
+                            if stream_parts is not None:
+                                outputs[-1]['text'] = ''.join(stream_parts)
+                                stream_parts = None
+                            if msg_type == 'stream':
+                                stream_parts = [output['text']]
+                            outputs.append(output)
+
+            # Check for shell reply (execution complete) - AFTER processing IOPub
+            if shell_socket in events:
+                reply = client.shell_channel.get_msg(timeout=0)
+                # Handle async get_msg
+                if isawaitable(reply):
+                    reply = await reply
+
+                if reply['parent_header'].get('msg_id') == parent_msg_id:
+                    execution_done = True
+                    execution_done_time = now()
+                    # Capture execution_count from shell reply if not already captured
+                    if execution_count is None:
+                        reply_content = reply.get('content', {})
+                        execution_count = reply_content.get('execution_count')
+
+        # Clean up
+        client.stop_channels()
+
+        if stream_parts is not None:
+            outputs[-1]['text'] = ''.join(stream_parts)
+
+        # Kernel must return execution_count - fail if it doesn't
+        if execution_count is None:
+            raise RuntimeError("Kernel did not return execution_count in shell reply")
+
+        return (execution_count, outputs)
+
+    except Exception as e:
+        logger.error(f"Error executing code: {e}", exc_info=True)
+        raise
+
+
+_http_client = None
+
+
+def _get_http_client() -> Any:
+    """Return the HTTP client shared by all nbmodel REST calls."""
+    global _http_client
+    if _http_client is None:
+        from tornado.httpclient import AsyncHTTPClient
+        # Own instance so the larger pool doesn't reconfigure the server-wide default
+        _http_client = AsyncHTTPClient(force_instance=True, max_clients=64)
+    return _http_client
+
+
+_server_config = None
+
+
+def _get_server_config() -> Tuple[str, Dict[str, str], Dict[str, str]]:
+    """Return the server URL and request headers for the nbmodel REST API.
+
+    Read from the environment on first use; the values are constant for the
+    lifetime of the process.
+
+    Returns:
+        (server_url, post_headers, get_headers) tuple
+
+    Raises:
+        RuntimeError: If JUPYTERHUB_API_TOKEN is not set
+    """
+    global _server_config
+    if _server_config is None:
+        hub_token = os.environ.get('JUPYTERHUB_API_TOKEN')
+        if not hub_token:
+            raise RuntimeError("JUPYTERHUB_API_TOKEN not found in environment")
+
+        base_url = os.environ.get('JUPYTERHUB_SERVICE_PREFIX', '')
+        server_url = f"http://localhost:8888{base_url}"
+        get_headers = {"Authorization": f"token {hub_token}"}
+        post_headers = {**get_headers, "Content-Type": "application/json"}
+        _server_config = (server_url, post_headers, get_headers)
+    return _server_config
+
+
+@functools.lru_cache(maxsize=128)
+def _encode_execute_body(code: str, document_id: Optional[str], cell_id: Optional[str]) -> bytes:
+    """Encode the nbmodel execute request body.
+
+    Cached because agents often re-run identical cells (imports, setup code).
+    """
+    # Metadata links the execution to a notebook cell for RTC output broadcasting
+    metadata = {}
+    if document_id and cell_id:
+        metadata = {
+            "document_id": document_id,
+            "cell_id": cell_id
+        }
+    return _json_dumps({
+        "code": code,
+        "metadata": metadata
+    })
+
+
 async def execute_via_execution_stack(
     serverapp: Any,
     kernel_id: str,
@@ -108,7 +446,7 @@ async def execute_via_execution_stack(
     document_id: Optional[str] = None,
     cell_id: Optional[str] = None,
     timeout: int = 0,
-    poll_interval: float = 0.1
+    poll_interval: float = 0.5
 ) -> List[str]:
     """Execute code using jupyter-server-nbmodel REST API (non-blocking, preferred method).
 
@@ -123,7 +461,8 @@ async def execute_via_execution_stack(
         document_id: Optional document ID for RTC integration (format: json:notebook:<file_id>)
         cell_id: Optional cell ID for RTC integration
         timeout: Maximum time to wait for execution in seconds. 0 means no timeout.
-        poll_interval: Time between polling for results (seconds)
+        poll_interval: Maximum time between polls for results (seconds). Polling
+            starts at 5ms and doubles after each pending response up to this cap.
 
     Returns:
         List of formatted output strings
@@ -131,35 +470,19 @@ async def execute_via_execution_stack(
     Raises:
         TimeoutError: If execution exceeds timeout
     """
-    if not code or not code.strip():
+    if not code or code.isspace():
         return ["[Empty code]"]
 
     try:
-        import os
-        import json as json_module
-        from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+        from tornado.httpclient import HTTPRequest
 
         logger.info(f"execute_via_execution_stack: Starting execution for kernel {kernel_id}")
 
-        # Get JupyterHub API token from environment
-        hub_token = os.environ.get('JUPYTERHUB_API_TOKEN')
-        if not hub_token:
-            raise RuntimeError("JUPYTERHUB_API_TOKEN not found in environment")
-
-        # Get server base URL
-        base_url = os.environ.get('JUPYTERHUB_SERVICE_PREFIX', '')
-        server_url = f"http://localhost:8888{base_url}"
-
-        # Build metadata for RTC integration
-        metadata = {}
-        if document_id and cell_id:
-            metadata = {
-                "document_id": document_id,
-                "cell_id": cell_id
-            }
+        # Server URL and JupyterHub auth headers
+        server_url, post_headers, get_headers = _get_server_config()
 
         # Submit execution request via REST API
-        http_client = AsyncHTTPClient()
+        http_client = _get_http_client()
         execute_url = f"{server_url}api/kernels/{kernel_id}/execute"
 
         logger.info(f"Submitting execution request to {execute_url}")
@@ -167,14 +490,8 @@ async def execute_via_execution_stack(
         request = HTTPRequest(
             url=execute_url,
             method="POST",
-            headers={
-                "Authorization": f"token {hub_token}",
-                "Content-Type": "application/json"
-            },
-            body=json_module.dumps({
-                "code": code,
-                "metadata": metadata
-            })
+            headers=post_headers,
+            body=_encode_execute_body(code, document_id, cell_id)
         )
 
         response = await http_client.fetch(request)
@@ -192,29 +509,33 @@ async def execute_via_execution_stack(
 
         # Poll for results
         result_url = f"{server_url}{location.lstrip('/')}"
-        start_time = asyncio.get_event_loop().time()
+        # The poll request never changes, so build it once and reuse it
+        result_request = HTTPRequest(
+            url=result_url,
+            method="GET",
+            headers=get_headers
+        )
+        now = asyncio.get_running_loop().time
+        start_time = now()
+        delay = 0.005
 
         while True:
-            elapsed = asyncio.get_event_loop().time() - start_time
+            elapsed = now() - start_time
             if timeout > 0 and elapsed > timeout:
                 raise TimeoutError(f"Execution timed out after {timeout} seconds")
 
             # Poll result endpoint
-            result_request = HTTPRequest(
-                url=result_url,
-                method="GET",
-                headers={"Authorization": f"token {hub_token}"}
-            )
-
             result_response = await http_client.fetch(result_request, raise_error=False)
 
             if result_response.code == 202:
-                # Still pending
-                await asyncio.sleep(poll_interval)
+                # Still pending - back off so short cells return quickly while
+                # long-running cells don't wake the event loop at a fixed rate
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, poll_interval)
                 continue
             elif result_response.code == 200:
                 # Execution complete
-                result = json_module.loads(result_response.body)
+                result = _json_loads(result_response.body)
                 logger.info(f"Execution request {request_id} completed")
 
                 # Check for errors
@@ -229,8 +550,8 @@ async def execute_via_execution_stack(
                 # Parse JSON string if needed
                 if isinstance(outputs, str):
                     try:
-                        outputs = json_module.loads(outputs)
-                    except json_module.JSONDecodeError:
+                        outputs = _json_loads(outputs)
+                    except ValueError:
                         logger.error(f"Failed to parse outputs JSON: {outputs}")
                         return [f"[ERROR: Invalid output format]"]
 
@@ -291,6 +612,22 @@ async def execute_code_with_timeout(
     )
 
 
+def _format_output(output: Any) -> str:
+    if isinstance(output, str):
+        return output
+    if isinstance(output, dict):
+        # Handle nbformat output structure
+        if 'text' in output:
+            return output['text']
+        data = output.get('data')
+        if data is not None:
+            plain_text = data.get('text/plain')
+            if plain_text is not None:
+                return plain_text
+            return str(data)
+    return str(output)
+
+
 def format_outputs(outputs: List[Any]) -> List[str]:
     """Format outputs for display.
 
@@ -303,23 +640,4 @@ def format_outputs(outputs: List[Any]) -> List[str]:
     if not outputs:
         return ["[No output]"]
 
-    formatted = []
-    for output in outputs:
-        if isinstance(output, str):
-            formatted.append(output)
-        elif isinstance(output, dict):
-            # Handle nbformat output structure
-            if 'text' in output:
-                formatted.append(output['text'])
-            elif 'data' in output:
-                data = output['data']
-                if 'text/plain' in data:
-                    formatted.append(data['text/plain'])
-                else:
-                    formatted.append(str(data))
-            else:
-                formatted.append(str(output))
-        else:
-            formatted.append(str(output))
-
-    return formatted if formatted else ["[No output]"]
+    return [_format_output(output) for output in outputs]
@@ -3,23 +3,55 @@
 
 """Helper to access YNotebook documents via jupyter_server_ydoc."""
 
+import functools
 import logging
+import os
 from pathlib import Path
 from typing import Any, Optional
+from weakref import WeakKeyDictionary
 
 logger = logging.getLogger(__name__)
 
+# On POSIX a path is absolute exactly when it starts with "/"
+_IS_WINDOWS = os.name == "nt"
 
-def get_notebook_path(serverapp: Any, relative_path: str) -> str:
-    """Convert relative notebook path to absolute path."""
+# Room ID prefix jupyter_server_ydoc uses for notebook documents
+_ROOM_PREFIX = "json:notebook:"
+
+# serverapp -> loaded jupyter_server_ydoc extension app; extensions are loaded
+# once at startup, so the lookup only needs to happen on first use
+_ydoc_extensions: "WeakKeyDictionary[Any, Any]" = WeakKeyDictionary()
+
+
+@functools.lru_cache(maxsize=512)
+def _resolve_notebook_path(root_dir: str, relative_path: str) -> str:
     if Path(relative_path).is_absolute():
         return relative_path
-    if serverapp:
-        root_dir = serverapp.root_dir
+    if root_dir:
         return str(Path(root_dir) / relative_path)
     return relative_path
 
 
+def get_notebook_path(serverapp: Any, relative_path: str) -> str:
+    """Convert relative notebook path to absolute path."""
+    if not _IS_WINDOWS and relative_path.startswith("/"):
+        return relative_path
+    # Tools resolve the same few notebooks over and over, so results are cached
+    return _resolve_notebook_path(serverapp.root_dir if serverapp else "", relative_path)
+
+
+def _get_ydoc_extension(serverapp: Any) -> Optional[Any]:
+    """Return the jupyter_server_ydoc extension app, or None if not loaded."""
+    ydoc_extension = _ydoc_extensions.get(serverapp)
+    if ydoc_extension is None:
+        ydoc_extensions = serverapp.extension_manager.extension_apps.get("jupyter_server_ydoc", set())
+        if not ydoc_extensions:
+            return None
+        ydoc_extension = next(iter(ydoc_extensions))
+        _ydoc_extensions[serverapp] = ydoc_extension
+    return ydoc_extension
+
+
 async def get_jupyter_ydoc(serverapp: Any, notebook_path: str) -> Optional[Any]:
     """Get a YNotebook document for a notebook that is open in JupyterLab.
 
@@ -41,14 +73,16 @@ async def get_jupyter_ydoc(serverapp: Any, notebook_path: str) -> Optional[Any]:
             return None
 
         file_id = file_id_manager.get_id(abs_path)
-        document_id = f"json:notebook:{file_id}"
+        if file_id is None:
+            logger.error(f"No file ID for {abs_path}")
+            return None
+        document_id = _ROOM_PREFIX + file_id
 
-        ydoc_extensions = serverapp.extension_manager.extension_apps.get("jupyter_server_ydoc", set())
-        if not ydoc_extensions:
+        ydoc_extension = _get_ydoc_extension(serverapp)
+        if ydoc_extension is None:
             logger.error("jupyter_server_ydoc extension not loaded")
             return None
 
-        ydoc_extension = next(iter(ydoc_extensions))
         ydoc = await ydoc_extension.get_document(room_id=document_id, copy=False)
 
         if ydoc is None:
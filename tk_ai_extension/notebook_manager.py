@@ -14,6 +14,17 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+class NotebookEntry:
+    """A managed notebook: its file path and the kernel it is attached to."""
+
+    __slots__ = ("path", "kernel_id", "kernel_info")
+
+    def __init__(self, path: str, kernel_info: Dict[str, Any]):
+        self.path = path
+        self.kernel_id: Optional[str] = kernel_info.get("id")
+        self.kernel_info = kernel_info
+
+
 class NotebookManager:
     """
     Centralized manager for notebooks and their corresponding kernels.
@@ -26,8 +37,10 @@ class NotebookManager:
 
     def __init__(self):
         """Initialize the notebook manager."""
-        self._notebooks: Dict[str, Dict[str, Any]] = {}
+        self._notebooks: Dict[str, NotebookEntry] = {}
         self._current_notebook: Optional[str] = None
+        # Entry for _current_notebook, kept in sync so accessors skip the lookup
+        self._current_entry: Optional[NotebookEntry] = None
         logger.info("NotebookManager initialized")
 
     def __contains__(self, name: str) -> bool:
@@ -48,15 +61,17 @@ class NotebookManager:
             kernel_info: Kernel metadata dict with 'id' key
             path: Notebook file path
         """
-        self._notebooks[name] = {
-            "kernel": kernel_info,
-            "path": path
-        }
+        entry = NotebookEntry(path, kernel_info)
+        self._notebooks[name] = entry
 
         # Set as current notebook if this is the first one
         if self._current_notebook is None:
             self._current_notebook = name
 
+        # Re-adding the current notebook replaces its entry
+        if self._current_notebook == name:
+            self._current_entry = entry
+
         logger.info(f"Added notebook '{name}' at path '{path}' with kernel {kernel_info.get('id')}")
 
     def remove_notebook(self, name: str) -> bool:
@@ -77,8 +92,10 @@ class NotebookManager:
                 # Set to another notebook if available
                 if self._notebooks:
                     self._current_notebook = next(iter(self._notebooks.keys()))
+                    self._current_entry = self._notebooks[self._current_notebook]
                 else:
                     self._current_notebook = None
+                    self._current_entry = None
 
             logger.info(f"Removed notebook '{name}'")
             return True
@@ -94,10 +111,8 @@ class NotebookManager:
         Returns:
             Kernel ID string or None if not found
         """
-        if name in self._notebooks:
-            kernel_info = self._notebooks[name]["kernel"]
-            return kernel_info.get("id")
-        return None
+        entry = self._notebooks.get(name)
+        return entry.kernel_id if entry else None
 
     def set_current_notebook(self, name: str) -> bool:
         """
@@ -109,13 +124,38 @@ class NotebookManager:
         Returns:
             True if set successfully, False if notebook doesn't exist
         """
-        if name in self._notebooks:
+        entry = self._notebooks.get(name)
+        if entry is not None:
             self._current_notebook = name
+            self._current_entry = entry
             logger.info(f"Set current notebook to '{name}'")
             return True
         logger.warning(f"Cannot set current notebook to '{name}' - not found")
         return False
 
+    def use(
+        self,
+        name: str,
+        kernel_info: Optional[Dict[str, Any]] = None,
+        path: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Make a notebook current, adding it first if kernel info and path are given.
+
+        Args:
+            name: Notebook identifier
+            kernel_info: Kernel metadata dict with 'id' key (adds the notebook)
+            path: Notebook file path (adds the notebook)
+
+        Returns:
+            Path of the now-current notebook, or None if the notebook doesn't exist
+        """
+        if kernel_info is not None and path is not None:
+            self.add_notebook(name, kernel_info, path)
+        if not self.set_current_notebook(name):
+            return None
+        return self._current_entry.path
+
     def get_current_notebook(self) -> Optional[str]:
         """
         Get the name of the currently active notebook.
@@ -132,9 +172,8 @@ class NotebookManager:
         Returns:
             Notebook file path or None if no active notebook
         """
-        if self._current_notebook and self._current_notebook in self._notebooks:
-            return self._notebooks[self._current_notebook]["path"]
-        return None
+        entry = self._current_entry
+        return entry.path if entry else None
 
     def get_current_kernel_id(self) -> Optional[str]:
         """
@@ -143,9 +182,8 @@ class NotebookManager:
         Returns:
             Kernel ID or None if no active notebook
         """
-        if self._current_notebook:
-            return self.get_kernel_id(self._current_notebook)
-        return None
+        entry = self._current_entry
+        return entry.kernel_id if entry else None
 
     def list_all_notebooks(self) -> Dict[str, Dict[str, Any]]:
         """
@@ -154,14 +192,15 @@ class NotebookManager:
         Returns:
             Dictionary with notebook names as keys and their info as values
         """
-        result = {}
-        for name, notebook_data in self._notebooks.items():
-            result[name] = {
-                "path": notebook_data["path"],
-                "kernel_id": notebook_data["kernel"].get("id"),
-                "is_current": name == self._current_notebook
+        current = self._current_notebook
+        return {
+            name: {
+                "path": entry.path,
+                "kernel_id": entry.kernel_id,
+                "is_current": name == current
             }
-        return result
+            for name, entry in self._notebooks.items()
+        }
 
     def is_empty(self) -> bool:
         """Check if the manager is empty (no notebooks)."""
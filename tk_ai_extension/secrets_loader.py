@@ -0,0 +1,75 @@
+# Copyright 2025 Alejandro Martínez Corriá and the Thinkube contributors
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Loads the user's .secrets.env file into the server environment."""
+
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+SECRETS_PATH = Path.home() / 'thinkube' / 'notebooks' / '.secrets.env'
+
+# One KEY=value assignment per line, optionally prefixed with "export" and with
+# the value in single or double quotes; comments and other lines don't match
+_SECRET_LINE_RE = re.compile(
+    r'^[ \t]*(?:export[ \t]+)?([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*'
+    r'(?:"([^"\n]*)"|\'([^\'\n]*)\'|(.*?))[ \t]*$',
+    re.MULTILINE
+)
+
+# Modification time of the secrets file when it was last loaded
+_secrets_mtime_ns = None
+
+# Copy of os.environ passed to the agent; reset whenever secrets are reloaded
+_env_snapshot = None
+
+
+def parse_secrets(text: str) -> Dict[str, str]:
+    """Parse the contents of a .secrets.env file.
+
+    Quotes are only removed when they enclose the whole value, so anything
+    after a closing quote (including a '#' comment) is kept verbatim.
+
+    Args:
+        text: File contents
+
+    Returns:
+        Mapping of variable names to values; later assignments win
+    """
+    return {
+        key: double_quoted or single_quoted or bare
+        for key, double_quoted, single_quoted, bare in _SECRET_LINE_RE.findall(text)
+    }
+
+
+def load_secrets():
+    """Load secrets from .secrets.env file into environment.
+
+    The file is only re-read when its modification time changes.
+    """
+    global _secrets_mtime_ns, _env_snapshot
+    try:
+        mtime_ns = SECRETS_PATH.stat().st_mtime_ns
+    except OSError:
+        return
+    if mtime_ns == _secrets_mtime_ns:
+        return
+    _env_snapshot = None
+    try:
+        with open(SECRETS_PATH, 'r') as f:
+            os.environ.update(parse_secrets(f.read()))
+        _secrets_mtime_ns = mtime_ns
+    except Exception as e:
+        logger.warning(f"Failed to load secrets from {SECRETS_PATH}: {e}")
+
+
+def get_env_snapshot() -> Dict[str, str]:
+    """Return a copy of the process environment, reused until secrets change."""
+    global _env_snapshot
+    if _env_snapshot is None:
+        _env_snapshot = dict(os.environ)
+    return _env_snapshot
@@ -4,6 +4,7 @@
 """WebSocket handler for streaming Claude responses with cancellation support."""
 
 import asyncio
+import functools
 import json
 import logging
 import os
@@ -11,27 +12,66 @@ from pathlib import Path
 from tornado import websocket
 from jupyter_server.base.handlers import JupyterHandler
 
-logger = logging.getLogger(__name__)
+from .secrets_loader import load_secrets, get_env_snapshot
 
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+    _JSONDecodeError = orjson.JSONDecodeError
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+    _json_loads = json.loads
+    _JSONDecodeError = json.JSONDecodeError
 
-def load_secrets():
-    """Load secrets from .secrets.env file into environment."""
-    secrets_path = Path.home() / 'thinkube' / 'notebooks' / '.secrets.env'
-    if secrets_path.exists():
-        try:
-            with open(secrets_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                    if line.startswith('export '):
-                        line = line[7:]
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        value = value.strip('"').strip("'")
-                        os.environ[key] = value
-        except Exception as e:
-            logger.warning(f"Failed to load secrets: {e}")
+logger = logging.getLogger(__name__)
+
+# Constant frames, encoded once
+_MSG_CANCELLED = _json_dumps({"type": "cancelled"})
+_MSG_MISSING_MESSAGE = _json_dumps({"type": "error", "message": "message is required"})
+_MSG_MISSING_NOTEBOOK_PATH = _json_dumps({"type": "error", "message": "notebook_path is required"})
+_MSG_INVALID_JSON = _json_dumps({"type": "error", "message": "Invalid JSON"})
+_MSG_NO_CREDENTIALS = _json_dumps({"type": "error", "message": "Claude API credentials not found"})
+_MSG_SDK_MISSING = _json_dumps({"type": "error", "message": "claude-agent-sdk not installed"})
+_MSG_SERVER_CONFIG_ERROR = _json_dumps({"type": "error", "message": "Server configuration error"})
+
+# Tools whose results the frontend reads (undo tracking, markdown re-render)
+_CELL_EDIT_TOOLS = frozenset({"overwrite_cell", "overwrite_cell_source", "insert_cell", "delete_cell"})
+
+# Text blocks arriving within this window (seconds) are sent as one token frame
+TOKEN_FLUSH_INTERVAL = 0.016
+
+
+def _find_handler(handlers: dict, obj):
+    """Look up the handler for obj's type, falling back to isinstance for subclasses."""
+    handler = handlers.get(type(obj))
+    if handler is None:
+        for cls, candidate in handlers.items():
+            if isinstance(obj, cls):
+                return candidate
+    return handler
+
+
+def _parse_tool_result(block):
+    """Decode the JSON payload of a tool result, or None if it isn't JSON."""
+    content = getattr(block, 'content', None)
+    try:
+        if isinstance(content, str):
+            return _json_loads(content)
+        elif isinstance(content, list) and content:
+            first = content[0]
+            if hasattr(first, 'text'):
+                return _json_loads(first.text)
+    except (ValueError, TypeError):
+        pass
+    return None
+
+
+def _ignore_write_error(future):
+    """Retrieve the result of an unawaited write so a closed socket isn't logged."""
+    if not future.cancelled():
+        future.exception()
 
 
 class MCPStreamingWebSocket(websocket.WebSocketHandler, JupyterHandler):
@@ -41,7 +81,7 @@ class MCPStreamingWebSocket(websocket.WebSocketHandler, JupyterHandler):
     - Client sends: {"type": "chat", "message": "...", "notebook_path": "..."}
     - Client sends: {"type": "cancel"} to abort current request
     - Client sends: {"type": "tool_response", "id": "...", "result": {...}}
-    - Server sends: {"type": "token", "content": "..."} for each token
+    - Server sends: {"type": "token", "content": "..."} for streamed text (batched)
     - Server sends: {"type": "tool_call", "name": "...", "args": {...}}
     - Server sends: {"type": "tool_request", "id": "...", "name": "...", "args": {...}}
     - Server sends: {"type": "tool_result", "name": "...", "result": {...}}
@@ -53,8 +93,11 @@ class MCPStreamingWebSocket(websocket.WebSocketHandler, JupyterHandler):
     def initialize(self):
         """Initialize the WebSocket handler."""
         self._current_task: asyncio.Task | None = None
-        self._cancelled = False
+        # Set when the current request is cancelled; cleared when a new one starts
+        self._cancel_event = asyncio.Event()
         self._notebook_path: str | None = None
+        self._token_buffer: list[str] = []
+        self._token_flush_handle: asyncio.TimerHandle | None = None
 
     def check_origin(self, origin):
         """Allow WebSocket connections from the same origin."""
@@ -63,7 +106,8 @@ class MCPStreamingWebSocket(websocket.WebSocketHandler, JupyterHandler):
     def open(self):
         """Handle WebSocket connection opened."""
         logger.info("WebSocket connection opened")
-        self._cancelled = False
+        self._cancel_event.clear()
+        load_secrets()
         # Register this WebSocket for frontend delegation
         from .frontend_delegation import set_active_websocket
         set_active_websocket(self)
@@ -78,20 +122,59 @@ class MCPStreamingWebSocket(websocket.WebSocketHandler, JupyterHandler):
 
     def _cancel_current_request(self):
         """Cancel any ongoing request."""
-        self._cancelled = True
+        self._cancel_event.set()
+        self._discard_tokens()
         if self._current_task and not self._current_task.done():
             self._current_task.cancel()
             logger.info("Cancelled current request")
 
+    def _queue_token(self, text: str):
+        """Buffer streamed text and schedule it to be sent shortly."""
+        self._token_buffer.append(text)
+        if self._token_flush_handle is None:
+            self._token_flush_handle = asyncio.get_running_loop().call_later(
+                TOKEN_FLUSH_INTERVAL, self._flush_tokens
+            )
+
+    def _flush_tokens(self):
+        """Send buffered text as a single token frame."""
+        if self._token_flush_handle is not None:
+            self._token_flush_handle.cancel()
+            self._token_flush_handle = None
+        if not self._token_buffer:
+            return
+        content = ''.join(self._token_buffer)
+        self._token_buffer.clear()
+        try:
+            # The frame is queued synchronously, so ordering with later writes holds
+            self.write_message(_json_dumps({
+                "type": "token",
+                "content": content
+            })).add_done_callback(_ignore_write_error)
+        except websocket.WebSocketClosedError:
+            pass
+
+    def _discard_tokens(self):
+        """Drop buffered text without sending it."""
+        if self._token_flush_handle is not None:
+            self._token_flush_handle.cancel()
+            self._token_flush_handle = None
+        self._token_buffer.clear()
+
+    async def _send(self, message):
+        """Send a non-token frame (dict or pre-encoded bytes) after any buffered text."""
+        self._flush_tokens()
+        await self.write_message(message if isinstance(message, bytes) else _json_dumps(message))
+
     async def on_message(self, message):
         """Handle incoming WebSocket message."""
         try:
-            data = json.loads(message)
+            data = _json_loads(message)
             msg_type = data.get('type')
 
             if msg_type == 'cancel':
                 self._cancel_current_request()
-                await self.write_message(json.dumps({"type": "cancelled"}))
+                await self.write_message(_MSG_CANCELLED)
                 return
 
             if msg_type == 'tool_response':
@@ -108,23 +191,17 @@ class MCPStreamingWebSocket(websocket.WebSocketHandler, JupyterHandler):
                 notebook_path = data.get('notebook_path')
 
                 if not user_message:
-                    await self.write_message(json.dumps({
-                        "type": "error",
-                        "message": "message is required"
-                    }))
+                    await self.write_message(_MSG_MISSING_MESSAGE)
                     return
 
                 if not notebook_path:
-                    await self.write_message(json.dumps({
-                        "type": "error",
-                        "message": "notebook_path is required"
-                    }))
+                    await self.write_message(_MSG_MISSING_NOTEBOOK_PATH)
                     return
 
                 # Cancel any existing task before starting a new one
                 if self._current_task and not self._current_task.done():
                     logger.info("Cancelling previous request before starting new one")
-                    self._cancelled = True
+                    self._cancel_event.set()
                     self._current_task.cancel()
                     try:
                         await self._current_task
@@ -132,21 +209,18 @@ class MCPStreamingWebSocket(websocket.WebSocketHandler, JupyterHandler):
                         pass
 
                 self._notebook_path = notebook_path
-                self._cancelled = False
+                self._cancel_event.clear()
 
                 # Start streaming response in background task
                 self._current_task = asyncio.create_task(
                     self._stream_response(user_message, notebook_path)
                 )
 
-        except json.JSONDecodeError:
-            await self.write_message(json.dumps({
-                "type": "error",
-                "message": "Invalid JSON"
-            }))
+        except _JSONDecodeError:
+            await self.write_message(_MSG_INVALID_JSON)
         except Exception as e:
             logger.error(f"Error handling message: {e}")
-            await self.write_message(json.dumps({
+            await self.write_message(_json_dumps({
                 "type": "error",
                 "message": str(e)
             }))
@@ -154,15 +228,12 @@ class MCPStreamingWebSocket(websocket.WebSocketHandler, JupyterHandler):
     async def _stream_response(self, user_message: str, notebook_path: str):
         """Stream Claude's response token by token."""
         try:
-            # Load secrets
+            # Pick up secrets edited since the connection opened (a stat when unchanged)
             load_secrets()
 
             # Check credentials
             if not os.environ.get('CLAUDE_CODE_OAUTH_TOKEN') and not os.environ.get('ANTHROPIC_API_KEY'):
-                await self.write_message(json.dumps({
-                    "type": "error",
-                    "message": "Claude API credentials not found"
-                }))
+                await self.write_message(_MSG_NO_CREDENTIALS)
                 return
 
             # Import SDK
@@ -172,17 +243,16 @@ class MCPStreamingWebSocket(websocket.WebSocketHandler, JupyterHandler):
                     ToolUseBlock, ToolResultBlock
                 )
             except ImportError:
-                await self.write_message(json.dumps({
-                    "type": "error",
-                    "message": "claude-agent-sdk not installed"
-                }))
+                await self.write_message(_MSG_SDK_MISSING)
                 return
 
-            # Get MCP server
-            from .agent.tools_registry import create_jupyter_mcp_server, get_allowed_tool_names
-
-            jupyter_mcp = create_jupyter_mcp_server()
-            allowed_tools = get_allowed_tool_names()
+            # Get MCP server (built once at extension startup)
+            jupyter_mcp = self.settings.get('jupyter_mcp_server')
+            allowed_tools = self.settings.get('allowed_tool_names')
+            if jupyter_mcp is None or allowed_tools is None:
+                from .agent.tools_registry import create_jupyter_mcp_server, get_allowed_tool_names
+                jupyter_mcp = create_jupyter_mcp_server()
+                allowed_tools = get_allowed_tool_names()
 
             # Build system prompt
             user_notebooks = Path.home() / 'thinkube' / 'notebooks'
@@ -194,16 +264,13 @@ class MCPStreamingWebSocket(websocket.WebSocketHandler, JupyterHandler):
                 cwd=str(user_notebooks),
                 system_prompt=system_prompt,
                 setting_sources=["project"],
-                env=os.environ.copy()
+                env=get_env_snapshot()
             )
 
             # Get client
             client_manager = self.settings.get('claude_client_manager')
             if not client_manager:
-                await self.write_message(json.dumps({
-                    "type": "error",
-                    "message": "Server configuration error"
-                }))
+                await self.write_message(_MSG_SERVER_CONFIG_ERROR)
                 return
 
             client = await client_manager.get_or_create_client(notebook_path, options)
@@ -213,11 +280,42 @@ class MCPStreamingWebSocket(websocket.WebSocketHandler, JupyterHandler):
             await client.query(user_message)
 
             # Stream response
-            full_response = ""
+            response_parts = []
+            # Task.cancel() already interrupts the pending await; the event is a
+            # fallback in case the SDK swallows that CancelledError
+            cancelled = self._cancel_event.is_set
+
+            async def on_text(block):
+                response_parts.append(block.text)
+                self._queue_token(block.text)
+
+            async def on_assistant_message(message):
+                for block in message.content:
+                    if cancelled():
+                        return
+
+                    # Log block type for debugging
+                    logger.debug(f"[WS BLOCK TYPE] {type(block).__name__}")
+
+                    handler = _find_handler(block_handlers, block)
+                    if handler is not None:
+                        await handler(block)
+
+            # ToolUseBlock/ToolResultBlock can also arrive as top-level messages
+            message_handlers = {
+                ToolUseBlock: self._on_tool_use,
+                ToolResultBlock: self._on_tool_result_message,
+                AssistantMessage: on_assistant_message,
+            }
+            block_handlers = {
+                TextBlock: on_text,
+                ToolUseBlock: self._on_tool_use,
+                ToolResultBlock: self._on_tool_result_block,
+            }
 
             async for message in client.receive_response():
                 # Check for cancellation
-                if self._cancelled:
+                if cancelled():
                     logger.info("Request was cancelled")
                     return
 
@@ -225,119 +323,19 @@ class MCPStreamingWebSocket(websocket.WebSocketHandler, JupyterHandler):
                 msg_type_name = type(message).__name__
                 logger.info(f"[WS MESSAGE TYPE] {msg_type_name}")
 
-                # Handle ToolUseBlock as top-level message
-                if isinstance(message, ToolUseBlock):
-                    logger.info(f"[WS TOOL USE] {message.name}")
-                    await self.write_message(json.dumps({
-                        "type": "tool_call",
-                        "name": message.name,
-                        "args": message.input if hasattr(message, 'input') else {}
-                    }))
-                    continue
-
-                # Handle ToolResultBlock as top-level message
-                if isinstance(message, ToolResultBlock):
-                    tool_name = getattr(message, 'tool_use_id', 'unknown')
-                    is_error = getattr(message, 'is_error', False)
-                    logger.info(f"[WS TOOL RESULT] {tool_name} error={is_error}")
-
-                    # Try to parse result content
-                    result_data = None
-                    if hasattr(message, 'content'):
-                        try:
-                            if isinstance(message.content, str):
-                                result_data = json.loads(message.content)
-                            elif isinstance(message.content, list) and message.content:
-                                first = message.content[0]
-                                if hasattr(first, 'text'):
-                                    result_data = json.loads(first.text)
-                        except (json.JSONDecodeError, AttributeError):
-                            pass
-
-                    await self.write_message(json.dumps({
-                        "type": "tool_result",
-                        "name": tool_name,
-                        "success": not is_error,
-                        "result": result_data
-                    }))
-
-                    # Send cell_updated for markdown cells
-                    if result_data and 'cell_type' in result_data:
-                        cell_type = result_data.get('cell_type')
-                        cell_index = result_data.get('cell_index')
-                        if cell_type == 'markdown' and cell_index is not None:
-                            await self.write_message(json.dumps({
-                                "type": "cell_updated",
-                                "cell_type": "markdown",
-                                "cell_index": cell_index
-                            }))
-                    continue
-
-                if isinstance(message, AssistantMessage):
-                    for block in message.content:
-                        if self._cancelled:
-                            return
-
-                        # Log block type for debugging
-                        logger.debug(f"[WS BLOCK TYPE] {type(block).__name__}")
-
-                        if isinstance(block, TextBlock):
-                            # Stream text token
-                            full_response += block.text
-                            await self.write_message(json.dumps({
-                                "type": "token",
-                                "content": block.text
-                            }))
-
-                        elif isinstance(block, ToolUseBlock):
-                            # Notify about tool call
-                            await self.write_message(json.dumps({
-                                "type": "tool_call",
-                                "name": block.name,
-                                "args": block.input if hasattr(block, 'input') else {}
-                            }))
-
-                        elif isinstance(block, ToolResultBlock):
-                            # Notify about tool result with data for undo tracking
-                            result_data = None
-                            tool_name = getattr(block, 'name', 'unknown')
-                            if hasattr(block, 'content'):
-                                # Try to extract result data for cell operations
-                                try:
-                                    if isinstance(block.content, str):
-                                        result_data = json.loads(block.content)
-                                    elif isinstance(block.content, list) and block.content:
-                                        first = block.content[0]
-                                        if hasattr(first, 'text'):
-                                            result_data = json.loads(first.text)
-                                except (json.JSONDecodeError, AttributeError):
-                                    pass
-
-                            await self.write_message(json.dumps({
-                                "type": "tool_result",
-                                "name": tool_name,
-                                "success": not getattr(block, 'is_error', False),
-                                "result": result_data
-                            }))
-
-                            # Send cell_updated message for markdown cells to trigger re-render
-                            if result_data and tool_name == 'overwrite_cell_source':
-                                cell_type = result_data.get('cell_type')
-                                cell_index = result_data.get('cell_index')
-                                if cell_type == 'markdown' and cell_index is not None:
-                                    await self.write_message(json.dumps({
-                                        "type": "cell_updated",
-                                        "cell_type": "markdown",
-                                        "cell_index": cell_index
-                                    }))
+                handler = _find_handler(message_handlers, message)
+                if handler is not None:
+                    await handler(message)
+
+            full_response = ''.join(response_parts)
 
             # Send completion
-            if not self._cancelled:
+            if not cancelled():
                 logger.info(f"[WS RESPONSE COMPLETE] {len(full_response)} chars")
-                await self.write_message(json.dumps({
+                await self._send({
                     "type": "done",
                     "full_response": full_response
-                }))
+                })
 
                 # Save conversation
                 await self._save_conversation(notebook_path, user_message, full_response)
@@ -345,92 +343,149 @@ class MCPStreamingWebSocket(websocket.WebSocketHandler, JupyterHandler):
         except asyncio.CancelledError:
             logger.info("Request task was cancelled")
             try:
-                await self.write_message(json.dumps({"type": "cancelled"}))
+                await self._send(_MSG_CANCELLED)
             except Exception:
                 pass
 
         except Exception as e:
             logger.error(f"Error streaming response: {e}")
             try:
-                await self.write_message(json.dumps({
+                await self._send({
                     "type": "error",
                     "message": str(e)
-                }))
+                })
             except Exception:
                 pass
 
+    async def _on_tool_use(self, block):
+        """Notify the client about a tool call."""
+        logger.info(f"[WS TOOL USE] {block.name}")
+        await self._send({
+            "type": "tool_call",
+            "name": block.name,
+            "args": block.input if hasattr(block, 'input') else {}
+        })
+
+    async def _on_tool_result_message(self, message):
+        """Forward a top-level tool result."""
+        tool_name = getattr(message, 'tool_use_id', 'unknown')
+        is_error = getattr(message, 'is_error', False)
+        logger.info(f"[WS TOOL RESULT] {tool_name} error={is_error}")
+
+        result_data = _parse_tool_result(message)
+        await self._send({
+            "type": "tool_result",
+            "name": tool_name,
+            "success": not is_error,
+            "result": result_data
+        })
+
+        # Send cell_updated for markdown cells
+        if isinstance(result_data, dict):
+            await self._send_cell_updated(result_data)
+
+    async def _on_tool_result_block(self, block):
+        """Forward a tool result block with its data for undo tracking."""
+        tool_name = getattr(block, 'name', 'unknown')
+        # Other tools' results are never read by the client, so skip decoding them
+        result_data = _parse_tool_result(block) if tool_name in _CELL_EDIT_TOOLS else None
+        await self._send({
+            "type": "tool_result",
+            "name": tool_name,
+            "success": not getattr(block, 'is_error', False),
+            "result": result_data
+        })
+
+        # Send cell_updated message for markdown cells to trigger re-render
+        if tool_name == 'overwrite_cell_source' and isinstance(result_data, dict):
+            await self._send_cell_updated(result_data)
+
+    async def _send_cell_updated(self, result_data: dict):
+        """Tell the client to re-render a markdown cell the tool changed."""
+        if (result_data.get('cell_type') == 'markdown'
+                and (cell_index := result_data.get('cell_index')) is not None):
+            await self._send({
+                "type": "cell_updated",
+                "cell_type": "markdown",
+                "cell_index": cell_index
+            })
+
     async def _save_conversation(self, notebook_path: str, user_message: str, response: str):
         """Save conversation to notebook metadata."""
         try:
-            from .conversation_persistence import (
-                save_conversation_to_notebook,
-                load_conversation_from_notebook
-            )
+            from .conversation_persistence import append_to_conversation
 
-            existing = load_conversation_from_notebook(notebook_path)
-            updated = existing + [
+            serverapp = self.settings.get('serverapp')
+            append_to_conversation(notebook_path, [
                 {"role": "user", "content": user_message},
                 {"role": "assistant", "content": response}
-            ]
-
-            serverapp = self.settings.get('serverapp')
-            await save_conversation_to_notebook(notebook_path, updated, serverapp)
-            logger.info(f"Conversation saved to {notebook_path}")
+            ], serverapp)
+            logger.info(f"Conversation save scheduled for {notebook_path}")
         except Exception as e:
             logger.warning(f"Failed to save conversation: {e}")
 
     def _build_system_prompt(self, notebooks_dir: Path, notebook_path: str = None) -> str:
         """Build system prompt with notebook context."""
-        prompt_parts = [
-            "You are a helpful AI assistant with access to Jupyter notebooks and Thinkube services.",
-            "",
-            "IMPORTANT: Use concise formatting. Avoid excessive blank lines in your responses.",
-            "",
-            "## Current Context",
-            f"Working directory: {notebooks_dir}",
-        ]
-
-        if notebook_path:
-            prompt_parts.extend([
-                f"Currently open notebook: {notebook_path}",
-                ""
-            ])
-        else:
-            prompt_parts.append("")
-
+        return _system_prompt(str(notebooks_dir), notebook_path)
+
+
+# Everything after the per-request context lines of the system prompt
+_STATIC_PROMPT_TAIL = "\n".join([
+    "## Available Capabilities",
+    "- List and read Jupyter notebooks in the current directory",
+    "- List and read cells from notebooks",
+    "- Execute code cells in running kernels",
+    "- Modify cells using overwrite_cell (YDoc-based, instant updates)",
+    "- Insert, delete, and move cells",
+    "- Create new notebooks with create_notebook",
+    "- Discover installed Python packages and their versions",
+    "- Check module availability before using them",
+    "- Get detailed package information (dependencies, homepage, etc.)",
+    "- Access Thinkube services via ~/.thinkube_env environment variables",
+    "",
+    "## CRITICAL: Tool Selection for Notebooks",
+    "For ALL Jupyter notebook operations, ALWAYS use the MCP tools (mcp__jupyter__*), NEVER use Claude Code's built-in file tools:",
+    "",
+    "**NEVER use these built-in tools for notebooks:**",
+    "- Read tool → Use read_cell or list_cells instead",
+    "- NotebookEdit tool → Use overwrite_cell instead",
+    "- Write tool → Use create_notebook instead",
+    "- Edit tool → Use overwrite_cell instead",
+    "- Glob tool → Use list_notebooks instead",
+    "",
+    "## CRITICAL: Cell Numbering and Selection",
+    "- JupyterLab shows execution count [N] in the UI",
+    "- ALL cell operations use 0-based index (cell_index), NOT execution count",
+    "- User messages automatically include [Context: ...] showing selected/active cell indices",
+    "- When user says 'this cell' or 'the selected cell', use the index from [Context]",
+    "",
+    "- Always provide clear explanations of what you're doing",
+])
+
+
+@functools.lru_cache(maxsize=64)
+def _system_prompt(notebooks_dir: str, notebook_path: str = None) -> str:
+    """Assemble the system prompt; cached since it only varies by directory and notebook."""
+    prompt_parts = [
+        "You are a helpful AI assistant with access to Jupyter notebooks and Thinkube services.",
+        "",
+        "IMPORTANT: Use concise formatting. Avoid excessive blank lines in your responses.",
+        "",
+        "## Current Context",
+        f"Working directory: {notebooks_dir}",
+    ]
+
+    if notebook_path:
         prompt_parts.extend([
-            "## Available Capabilities",
-            "- List and read Jupyter notebooks in the current directory",
-            "- List and read cells from notebooks",
-            "- Execute code cells in running kernels",
-            "- Modify cells using overwrite_cell (YDoc-based, instant updates)",
-            "- Insert, delete, and move cells",
-            "- Create new notebooks with create_notebook",
-            "- Discover installed Python packages and their versions",
-            "- Check module availability before using them",
-            "- Get detailed package information (dependencies, homepage, etc.)",
-            "- Access Thinkube services via ~/.thinkube_env environment variables",
-            "",
-            "## CRITICAL: Tool Selection for Notebooks",
-            "For ALL Jupyter notebook operations, ALWAYS use the MCP tools (mcp__jupyter__*), NEVER use Claude Code's built-in file tools:",
-            "",
-            "**NEVER use these built-in tools for notebooks:**",
-            "- Read tool → Use read_cell or list_cells instead",
-            "- NotebookEdit tool → Use overwrite_cell instead",
-            "- Write tool → Use create_notebook instead",
-            "- Edit tool → Use overwrite_cell instead",
-            "- Glob tool → Use list_notebooks instead",
-            "",
-            "## CRITICAL: Cell Numbering and Selection",
-            "- JupyterLab shows execution count [N] in the UI",
-            "- ALL cell operations use 0-based index (cell_index), NOT execution count",
-            "- User messages automatically include [Context: ...] showing selected/active cell indices",
-            "- When user says 'this cell' or 'the selected cell', use the index from [Context]",
-            "",
-            "- Always provide clear explanations of what you're doing",
+            f"Currently open notebook: {notebook_path}",
+            ""
         ])
+    else:
+        prompt_parts.append("")
+
+    prompt_parts.append(_STATIC_PROMPT_TAIL)
 
-        if notebook_path:
-            prompt_parts.append(f"- When asked about 'this notebook' or 'current notebook', refer to {notebook_path}")
+    if notebook_path:
+        prompt_parts.append(f"- When asked about 'this notebook' or 'current notebook', refer to {notebook_path}")
 
-        return "\n".join(prompt_parts)
+    return "\n".join(prompt_parts)